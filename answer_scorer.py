@@ -0,0 +1,156 @@
+"""
+回答の具体性をローカル（CPUのみ）で採点し、深掘り判定のLLM呼び出しを省略するためのロジック
+明らかに浅い回答・明らかに十分な回答だけをローカルで判定し、判断が難しい回答はLLMに委ねる
+"""
+
+import re
+
+# 深掘り判定スコアラーの既定設定（secrets.toml の [followup_scorer] で上書き可能）
+DEFAULT_SCORER_CONFIG = {
+    # 閾値は未調整のため既定では無効（scripts/eval_followup_scorer.py でLLM判定との一致率を確認してから有効化する）
+    "enabled": False,
+    # スコアがこの値以下なら「深掘り必要（Yes）」と判定
+    "shallow_threshold": 0.30,
+    # スコアがこの値以上なら「深掘り不要（No）」と判定
+    "thorough_threshold": 0.75,
+    # この文字数未満の回答は無条件で浅いとみなす
+    "min_chars": 40,
+    # この文字数以上で長さスコアが満点になる
+    "target_chars": 300,
+    # 各特徴量の重み
+    "weight_length": 0.35,
+    "weight_numbers": 0.25,
+    "weight_examples": 0.20,
+    "weight_overlap": 0.20,
+}
+
+# 数値・定量表現（件数、割合、金額、期間など）
+NUMBER_PATTERN = re.compile(
+    r'[0-9０-９一二三四五六七八九十百千万億]+\s*(?:%|％|割|件|人|名|円|万|億|年|ヶ月|か月|カ月|月|週|日|時間|分|倍|社|回|点|位|本|台|ポイント)'
+)
+
+# 具体例・因果関係を示す表現（「経験」「担当」など、どの回答にも現れる一般的な語は含めない）
+EXAMPLE_MARKERS = (
+    "例えば", "たとえば", "具体的", "実際に", "その結果", "結果として", "なぜなら",
+    "というのも", "ため、", "ので、",
+)
+
+# 評価ポイントとの重なりを測るための文字種（漢字・カタカナ・英数字）
+KEYWORD_CHAR_PATTERN = re.compile(r'[一-龥ァ-ヴーA-Za-z0-9]+')
+
+
+# 深掘り判定スコアラーの設定を取得する関数
+def get_scorer_config():
+    from secrets_config import get_config_section
+    return get_config_section("followup_scorer", DEFAULT_SCORER_CONFIG)
+
+# テキストからキーワード用の2文字組（bigram）集合を作る関数
+def _keyword_bigrams(text):
+    bigrams = set()
+    for chunk in KEYWORD_CHAR_PATTERN.findall(text):
+        if len(chunk) == 1:
+            continue
+        for i in range(len(chunk) - 1):
+            bigrams.add(chunk[i:i + 2])
+    return bigrams
+
+# 回答の特徴量を抽出する関数
+def extract_features(answer, point_keys, evaluation_points_list, config=None):
+    """
+    Args:
+        answer (str): ユーザーの回答
+        point_keys (list): 質問カテゴリの評価軸キー
+        evaluation_points_list (dict): 評価ポイントの辞書（キー: 評価軸名、値: 説明）
+        config (dict): スコアラー設定（省略時は既定値）
+
+    Returns:
+        dict: 0〜1に正規化した特徴量（length, numbers, examples, overlap）と文字数
+    """
+    config = config or DEFAULT_SCORER_CONFIG
+    text = re.sub(r'\s+', '', answer or "")
+    char_count = len(text)
+
+    length_score = min(1.0, char_count / max(1, config["target_chars"]))
+
+    # 定量表現は2つあれば満点
+    number_score = min(1.0, len(NUMBER_PATTERN.findall(text)) / 2)
+
+    # 具体例・因果表現は3つあれば満点
+    example_hits = sum(1 for marker in EXAMPLE_MARKERS if marker in text)
+    example_score = min(1.0, example_hits / 3)
+
+    # 評価ポイント（キー名と説明文）との語彙の重なり
+    point_text = " ".join(
+        f"{k} {evaluation_points_list.get(k, '')}" for k in (point_keys or [])
+    )
+    point_bigrams = _keyword_bigrams(point_text)
+    if point_bigrams:
+        shared = point_bigrams & _keyword_bigrams(text)
+        # 評価ポイント語彙の2割に触れていれば満点
+        overlap_score = min(1.0, len(shared) / (len(point_bigrams) * 0.2))
+    else:
+        overlap_score = 0.0
+
+    return {
+        "char_count": char_count,
+        "length": length_score,
+        "numbers": number_score,
+        "examples": example_score,
+        "overlap": overlap_score,
+    }
+
+# 回答の充実度スコア（0〜1）を計算する関数
+def score_answer(answer, point_keys, evaluation_points_list, config=None):
+    config = config or DEFAULT_SCORER_CONFIG
+    features = extract_features(answer, point_keys, evaluation_points_list, config)
+    return (
+        config["weight_length"] * features["length"]
+        + config["weight_numbers"] * features["numbers"]
+        + config["weight_examples"] * features["examples"]
+        + config["weight_overlap"] * features["overlap"]
+    )
+
+# 明らかなケースのみローカルで深掘り要否を判定する関数
+def decide_followup_locally(answer, point_keys, evaluation_points_list, config=None):
+    """
+    Args:
+        answer (str): 直前の質問に対するユーザーの回答
+        point_keys (list): 質問カテゴリの評価軸キー
+        evaluation_points_list (dict): 評価ポイントの辞書
+        config (dict): スコアラー設定（省略時は既定値）
+
+    Returns:
+        str or None: "Yes"（深掘り必要）、"No"（深掘り不要）、
+                     判断が難しい場合は None（LLMの judge_need_followup に委ねる）
+    """
+    config = config or DEFAULT_SCORER_CONFIG
+    if not config.get("enabled", True):
+        return None
+
+    if len(re.sub(r'\s+', '', answer or "")) < config["min_chars"]:
+        return "Yes"
+
+    score = score_answer(answer, point_keys, evaluation_points_list, config)
+    if score <= config["shallow_threshold"]:
+        return "Yes"
+    if score >= config["thorough_threshold"]:
+        return "No"
+    return None
+
+# 質問の語彙がその後の回答でどの程度すでに語られているか（0〜1）を返す関数
+def question_overlap(question, answers):
+    """
+    事前に生成した質問が、その後の回答で既に答えられていないかを確認するために使う。
+
+    Args:
+        question (str): 事前に生成した質問文
+        answers (list): 質問生成後にユーザーが回答した文章のリスト
+
+    Returns:
+        float: 質問のキーワードのうち回答に含まれる割合
+    """
+    question_bigrams = _keyword_bigrams(question)
+    if not question_bigrams or not answers:
+        return 0.0
+    answer_bigrams = _keyword_bigrams(" ".join(answers))
+    return len(question_bigrams & answer_bigrams) / len(question_bigrams)
@@ -1,31 +1,99 @@
 """
 面接ロールプレイシステムのロジック部分
+LLMを呼び出す関数は非同期版（agenerate_question など）を本体とし、LLMリクエストは共有イベントループ上で実行する
+（非同期版はどのイベントループから await してもよい）。
+同名の同期版（generate_question など）は非同期版を共有イベントループで実行して結果を待つ薄いラッパー。
 """
 
 import os
 import re
-from langchain_openai import ChatOpenAI
+import json
+import time
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+from llm_backends import LLMRouter
+from llm_metrics import get_recent_calls, percentile, record_call
+from llm_runtime import arun_llm_call, run_coroutine
+from prompt_cache import get_rendered_prompts, render_evaluation_points
+from tracing import traced, span, increment_counter
+
+# 質問生成の出力形式の既定設定（secrets.toml の [question_output] で上書き可能）
+# mode: "json"   - JSON形式 {"question": "..."} で質問のみを出力させる
+#       "stop"   - 停止シーケンスで履歴の続き（「あなた：」）の生成を打ち切る
+#       "legacy" - 従来通り自由形式で出力させ、clean_question_text で整形する
+# combined_followup: 深掘り判定と深掘り質問の生成を1回の呼び出しで行う（判定が No の場合もルール・評価ポイントを送るため
+#                    入力トークンは増える。scripts/bench_followup_modes.py で削減を確認できるまで既定は無効）
+DEFAULT_QUESTION_OUTPUT_CONFIG = {
+    "mode": "json",
+    "max_tokens": 300,
+    "combined_followup": False,
+}
+
+# 面接計画（各カテゴリの初回質問の一括生成）の既定設定（secrets.toml の [interview_plan] で上書き可能）
+DEFAULT_INTERVIEW_PLAN_CONFIG = {
+    "enabled": True,
+    # 事前生成した質問の語彙がその後の回答にこの割合以上含まれていれば、作り直す
+    "stale_overlap": 0.6,
+    # カテゴリ切り替え時に、生成中の計画を待つ最大秒数（超えたらその場で生成）
+    # 実際の待ち時間は、その場で生成した場合の典型的な待ち時間（直近の質問生成の中央値）が小さければそちらに合わせる
+    "wait_seconds": 3,
+    "max_tokens": 1200,
+}
+
+# 各カテゴリの初回質問をまとめて作成させるための指示
+OPENING_QUESTIONS_CONTENT = """この後の面接で扱う以下の各カテゴリについて、カテゴリの最初に投げかける質問を1つずつ作成してください。
+自己紹介の内容を踏まえ、カテゴリ同士で質問内容が重複しないようにしてください。
+
+{categories}"""
+
+# 初回質問の一覧をJSON形式で出力させるための追加指示
+OPENING_QUESTIONS_JSON_INSTRUCTION = """
+
+# 出力形式
+カテゴリの順番通りに質問文を並べた、次のJSON形式のみを出力してください。
+会話履歴の繰り返しや「面接官：」などの話者表記、前置きは含めないでください。
+{{"questions": ["1つ目のカテゴリの質問文", "2つ目のカテゴリの質問文"]}}"""
+
+# 深掘り質問を生成する際に質問カテゴリの内容として渡す指示
+FOLLOWUP_QUESTION_CONTENT = "上記に対する深掘り質問を1つ出力してください。"
+
+# JSON形式で質問のみを出力させるための追加指示
+QUESTION_JSON_INSTRUCTION = """
+
+# 出力形式
+面接官として次に投げかける質問文のみを、次のJSON形式で出力してください。
+会話履歴の繰り返しや「面接官：」などの話者表記、前置きは含めないでください。
+{{"question": "質問文"}}"""
+
+# 深掘り判定と深掘り質問をまとめて出力させるための指示（判定基準は JUDGE_TEMPLATE から流用）
+JUDGE_FOLLOWUP_CONTENT = """直前の回答に対して深掘り質問が必要かを判定し、必要な場合のみ深掘り質問を1つ作成してください。
+判定基準は以下の通りです。
+
+{judge_criteria}"""
+
+# 深掘り判定と深掘り質問をJSON形式で出力させるための追加指示
+JUDGE_FOLLOWUP_JSON_INSTRUCTION = """
+
+# 出力形式
+次のJSON形式のみを出力してください。深掘りが不要な場合は question を空文字にしてください。
+会話履歴の繰り返しや「面接官：」などの話者表記、前置きは含めないでください。
+{{"need_followup": true または false, "question": "深掘り質問文"}}"""
+
+# JSON出力から "question" の値を取り出すパターン（閉じていない文字列にも一致させる）
+QUESTION_VALUE_PATTERN = re.compile(r'"question"\s*:\s*"((?:[^"\\]|\\.)*)')
+
+# 履歴の続きを生成し始めた時点で出力を打ち切る停止シーケンス
+QUESTION_STOP_SEQUENCES = ["\nあなた：", "あなた："]
 
 
 
 # ユーザープロフィールを基にルールプロンプトを生成する関数
 def get_rules(profile):
-    from secrets_config import get_prompts_from_secrets
-    prompts = get_prompts_from_secrets()
-    return prompts["RULES_TEMPLATE"].format(
-        age=profile["age"],
-        current_gyokai=profile["current_gyokai"],
-        current_job=profile["current_job"],
-        role=profile["role"],
-        experience_years=profile["experience_years"],
-        target_gyokai=profile["target_gyokai"],
-        target_job=profile["target_job"]
-    )
+    # プロンプト一式のバージョンとプロフィールごとに1回だけ組み立てる
+    return get_rendered_prompts().get_rules(profile)
 
 # OpenAI APIキーの有効性を検証する関数
-def validate_api_key(api_key):
+async def avalidate_api_key(api_key):
     """
     Args:
         api_key (str): 検証するOpenAI APIキー
@@ -38,20 +106,9 @@ def validate_api_key(api_key):
         return False, "有効なOpenAI APIキーを入力してください（sk-で始まる必要があります）"
     
     try:
-        # 簡単なテスト用のLLMインスタンスを作成
-        test_llm = ChatOpenAI(
-            model="gpt-4o-mini",  # より安価なモデルでテスト
-            temperature=0,
-            openai_api_key=api_key,
-            max_tokens=10
-        )
-        
-        # 最小限のテスト呼び出し
+        # 検証用ルート（既定は安価な gpt-4o-mini）で最小限のテスト呼び出しを実行
         test_prompt = ChatPromptTemplate.from_template("こんにちは")
-        test_chain = test_prompt | test_llm | StrOutputParser()
-        
-        # APIキーテスト実行
-        test_chain.invoke({})
+        await _ainvoke_prompt("validate", test_prompt, LLMRouter(api_key), {})
         
         return True, "APIキーが正常に検証されました"
         
@@ -66,6 +123,10 @@ def validate_api_key(api_key):
         else:
             return False, f"APIキーの検証中にエラーが発生しました: {error_msg}"
 
+# OpenAI APIキーの有効性を検証する関数（同期版）
+def validate_api_key(api_key):
+    return run_coroutine(lambda: avalidate_api_key(api_key), "validate")
+
 # LLM（言語モデル）をセットアップする関数
 def setup_llm(api_key):
     if not api_key:
@@ -73,17 +134,15 @@ def setup_llm(api_key):
     
     os.environ["OPENAI_API_KEY"] = api_key
     
-    return ChatOpenAI(
-        model="gpt-4o",
-        temperature=0.7,
-        openai_api_key=api_key
-    )
+    # 呼び出し種別ごとのバックエンドは secrets.toml の [llm_backends] で設定
+    return LLMRouter(api_key)
 
 # 文章の句読点で改行を挿入する関数（読みやすさ向上）
 def add_newlines_by_period(text):
     return re.sub(r'(?<=[。？！])', '\n', text)
 
 # チャット履歴をテキスト形式で取得する関数（LLMへの入力用）
+@traced()
 def get_history_text(chat_history):
     if not chat_history:
         return ""
@@ -97,8 +156,174 @@ def get_history_text(chat_history):
     
     return "\n".join(history_lines)
 
+# 質問文から余計な履歴を除去して純粋な質問のみを抽出する関数
+def clean_question_text(question_text):
+    # 「面接官：」以降の部分を抽出
+    if "面接官：" in question_text:
+        # 最後の「面接官：」以降を取得
+        parts = question_text.split("面接官：")
+        if len(parts) > 1:
+            return parts[-1].strip()
+    
+    # 「面接官：」がない場合、改行で分割して最後の質問部分を取得
+    lines = question_text.strip().split('\n')
+    
+    # 自己紹介や履歴部分を除去して質問部分を探す
+    for i in range(len(lines) - 1, -1, -1):
+        line = lines[i].strip()
+        # 質問文の特徴を持つ行を探す
+        if line and ('？' in line or 'か？' in line or 'ですか' in line or 'ください' in line):
+            # その行から質問部分を抽出
+            if '？' in line:
+                question_parts = line.split('？')
+                if len(question_parts) >= 2:
+                    # 最後の「？」までを質問として扱う
+                    return '？'.join(question_parts[:-1]) + '？'
+            return line
+    
+    # 最後の手段として、最後の文を返す
+    if lines:
+        return lines[-1].strip()
+    
+    return question_text.strip()
+
+# LLMの応答メッセージからトークン使用量を取り出す関数
+def _get_token_usage(message):
+    usage = (getattr(message, "response_metadata", None) or {}).get("token_usage") or {}
+    return usage.get("prompt_tokens"), usage.get("completion_tokens")
+
+# 1つのLLMでプロンプトを非同期に実行し、メトリクスを記録して応答メッセージを返す関数
+async def _ainvoke_model(call_type, prompt, model, inputs, metric_attributes, llm_kwargs):
+    if llm_kwargs:
+        model = model.bind(**llm_kwargs)
+    # prompt | model のチェーンにすると呼び出しごとにチェーン全体をシリアライズする（コールバック用）ため、
+    # プロンプトは直接展開してモデルだけを呼び出す
+    messages = prompt.format_messages(**inputs)
+    
+    start = time.perf_counter()
+    try:
+        message = await model.ainvoke(messages)
+    except Exception as e:
+        if _is_rejected_request_error(e):
+            # リクエスト内容（response_format など）の問題はバックエンドの障害として健全性に数えない
+            record_call(call_type, time.perf_counter() - start, rejected=type(e).__name__, **metric_attributes)
+        else:
+            record_call(call_type, time.perf_counter() - start, error=type(e).__name__, **metric_attributes)
+        raise
+    
+    prompt_tokens, completion_tokens = _get_token_usage(message)
+    record_call(call_type, time.perf_counter() - start, prompt_tokens, completion_tokens, **metric_attributes)
+    return message
+
+# 1つのLLMでプロンプトを実行し、応答メッセージを返すコルーチン（同時実行数の制限・ヘッジは llm_runtime が担当）
+async def _acall_model(call_type, prompt, model, inputs, metric_attributes, llm_kwargs):
+    with span(f"llm.{call_type}", call_type=call_type, **metric_attributes) as current_span:
+        message = await arun_llm_call(
+            lambda: _ainvoke_model(call_type, prompt, model, inputs, metric_attributes, llm_kwargs),
+            call_type
+        )
+        
+        prompt_tokens, completion_tokens = _get_token_usage(message)
+        if prompt_tokens is not None:
+            current_span.set_attribute("prompt_tokens", prompt_tokens)
+            increment_counter("mensetsu_llm_tokens_total", prompt_tokens, call_type=call_type, kind="prompt")
+        if completion_tokens is not None:
+            current_span.set_attribute("completion_tokens", completion_tokens)
+            increment_counter("mensetsu_llm_tokens_total", completion_tokens, call_type=call_type, kind="completion")
+    return message
+
+# プロンプトをLLMで実行し、メトリクスを記録してテキストを返すコルーチン
+async def _ainvoke_prompt(call_type, prompt, llm, inputs, metric_attributes=None, **llm_kwargs):
+    """
+    Args:
+        call_type (str): 呼び出し種別（"question", "judge", "feedback" など）
+        prompt: ChatPromptTemplate
+        llm: setup_llm で作成した LLMRouter、または単体のLangChain LLMインスタンス
+        inputs (dict): プロンプトへの入力値
+        metric_attributes (dict): メトリクスに付加する情報
+        **llm_kwargs: max_tokens や stop など、この呼び出しだけに適用するLLMパラメータ
+
+    Returns:
+        str: LLMの出力テキスト
+    """
+    metric_attributes = metric_attributes or {}
+    if not isinstance(llm, LLMRouter):
+        message = await _acall_model(call_type, prompt, llm, inputs, metric_attributes, llm_kwargs)
+        return StrOutputParser().invoke(message)
+    
+    # ルーターの場合は優先順にバックエンドを試し、失敗したら次のバックエンドへ切り替える
+    # （中断時の asyncio.CancelledError は Exception ではないため、他のバックエンドで再試行しない）
+    # リクエスト内容を受け付けなかった場合は切り替えずに送出し、呼び出し元が同じバックエンドで出力形式を変えて再試行する
+    last_error = None
+    for backend in llm.candidates(call_type):
+        try:
+            message = await _acall_model(
+                call_type, prompt, llm.get_model(backend), inputs,
+                dict(metric_attributes, backend=backend), llm_kwargs
+            )
+            return StrOutputParser().invoke(message)
+        except Exception as e:
+            if _is_rejected_request_error(e):
+                raise
+            last_error = e
+    raise last_error
+
+# 質問生成の出力形式設定を取得する関数
+def get_question_output_config():
+    from secrets_config import get_config_section
+    return get_config_section("question_output", DEFAULT_QUESTION_OUTPUT_CONFIG)
+
+# JSON形式の質問出力を検証して質問文を取り出す関数
+def parse_question_output(output):
+    """
+    Args:
+        output (str): JSON形式で出力させたLLMの応答
+        
+    Returns:
+        str or None: 質問文（形式不正や履歴の混入がある場合は None）
+    """
+    try:
+        question = json.loads(output).get("question")
+    except (ValueError, AttributeError):
+        return None
+    
+    if not isinstance(question, str) or not question.strip():
+        return None
+    if "面接官：" in question or "あなた：" in question:
+        return None
+    return question.strip()
+
+# 途中で切れたJSONなど、形式が不正な出力から "question" の値だけを取り出す関数
+def extract_question_value(output):
+    """
+    Args:
+        output (str): JSON形式で出力させたLLMの応答
+        
+    Returns:
+        str or None: "question" の値（見つからない場合は None）
+    """
+    match = QUESTION_VALUE_PATTERN.search(output or "")
+    if not match:
+        return None
+    raw = match.group(1)
+    try:
+        value = json.loads(f'"{raw}"')
+    except ValueError:
+        # エスケープの途中で切れている場合は末尾のバックスラッシュを除いて解釈し直す
+        raw = raw.rstrip("\\")
+        try:
+            value = json.loads(f'"{raw}"')
+        except ValueError:
+            value = raw
+    return value.strip() or None
+
+# response_format などのリクエスト内容をバックエンドが受け付けなかったかを判定する関数
+def _is_rejected_request_error(error):
+    import openai
+    return isinstance(error, (openai.BadRequestError, openai.UnprocessableEntityError))
+
 # AIを使って面接質問を生成する関数（メイン機能）
-def generate_question(llm, rules, question_content, evaluation_points, history):
+async def agenerate_question(llm, rules, question_content, evaluation_points, history):
     """
     Args:
         llm: 設定済みのLangChain LLMインスタンス
@@ -108,23 +333,275 @@ def generate_question(llm, rules, question_content, evaluation_points, history):
         history (str): これまでの会話履歴
         
     Returns:
-        str: 生成された面接質問文（LLMが出力したテキスト）
+        str: 生成された面接質問文（履歴の繰り返しや前置きを除いた質問のみ）
     """
-    from secrets_config import get_prompts_from_secrets
-    prompts = get_prompts_from_secrets()
-    
-    question_prompt = ChatPromptTemplate.from_template(prompts["QUESTION_TEMPLATE"])
-    create_question_chain = question_prompt | llm | StrOutputParser()
+    rendered = get_rendered_prompts()
+    output_config = get_question_output_config()
+    mode = output_config["mode"]
     
-    return create_question_chain.invoke({
+    inputs = {
         "rules": rules,
         "question": question_content,
         "evaluation_points": evaluation_points,
         "history": history
-    })
+    }
+    
+    if mode == "json":
+        question_prompt = rendered.get_template("QUESTION_TEMPLATE", QUESTION_JSON_INSTRUCTION)
+        try:
+            output = await _ainvoke_prompt(
+                "question", question_prompt, llm, inputs,
+                metric_attributes={"mode": mode},
+                max_tokens=output_config["max_tokens"],
+                response_format={"type": "json_object"}
+            )
+        except Exception as e:
+            if not _is_rejected_request_error(e):
+                raise
+            # response_format に対応していないバックエンドでは停止シーケンス方式で生成し直す
+            mode = "stop"
+        else:
+            question = parse_question_output(output)
+            if question is not None:
+                return question
+            # 途中で切れたJSONなどは質問文の値だけを取り出して整形し、JSONの記号を画面に出さない
+            value = extract_question_value(output)
+            if value is not None:
+                return clean_question_text(value)
+            if not output.lstrip().startswith("{"):
+                return clean_question_text(output)
+            # 質問文を取り出せないJSONの場合は従来形式で1回だけ生成し直す
+            mode = "legacy"
+    
+    if mode == "stop":
+        question_prompt = rendered.get_template("QUESTION_TEMPLATE")
+        output = await _ainvoke_prompt(
+            "question", question_prompt, llm, inputs,
+            metric_attributes={"mode": mode},
+            max_tokens=output_config["max_tokens"],
+            stop=QUESTION_STOP_SEQUENCES
+        )
+    else:
+        question_prompt = rendered.get_template("QUESTION_TEMPLATE")
+        output = await _ainvoke_prompt("question", question_prompt, llm, inputs, metric_attributes={"mode": mode})
+    
+    # 指示に従わなかった出力は従来のクリーニングで質問部分を抽出
+    return clean_question_text(output)
+
+# AIを使って面接質問を生成する関数（同期版）
+def generate_question(llm, rules, question_content, evaluation_points, history):
+    return run_coroutine(
+        lambda: agenerate_question(llm, rules, question_content, evaluation_points, history), "question"
+    )
+
+# 事前生成した初回質問を自己紹介に合わせて調整する関数
+async def apersonalize_question(llm, question, history):
+    """
+    Args:
+        llm: 設定済みLangChain LLMインスタンス
+        question (str): 質問バンクから取得した初回質問
+        history (str): これまでの会話履歴（自己紹介を含む）
+        
+    Returns:
+        str: 調整後の質問文（PERSONALIZE_TEMPLATE が未設定の場合は元の質問文）
+    """
+    rendered = get_rendered_prompts()
+    if not rendered.prompts.get("PERSONALIZE_TEMPLATE"):
+        return question
+    
+    personalize_prompt = rendered.get_template("PERSONALIZE_TEMPLATE")
+    output = await _ainvoke_prompt(
+        "personalize", personalize_prompt, llm,
+        {"question": question, "history": history},
+        max_tokens=get_question_output_config()["max_tokens"],
+        stop=QUESTION_STOP_SEQUENCES
+    )
+    return clean_question_text(output)
+
+# 事前生成した初回質問を自己紹介に合わせて調整する関数（同期版）
+def personalize_question(llm, question, history):
+    return run_coroutine(lambda: apersonalize_question(llm, question, history), "personalize")
+
+# 面接計画の設定を取得する関数
+def get_interview_plan_config():
+    from secrets_config import get_config_section
+    return get_config_section("interview_plan", DEFAULT_INTERVIEW_PLAN_CONFIG)
+
+# カテゴリ切り替え時に、生成中の面接計画を待つ秒数を返す関数
+def get_plan_wait_seconds():
+    """
+    Returns:
+        float: 待機する秒数（その場で生成するより長く待たないよう、直近の質問生成レイテンシの中央値を上限とする）
+    """
+    wait_seconds = float(get_interview_plan_config()["wait_seconds"])
+    latencies = [r["latency"] for r in get_recent_calls("question") if not r.get("error") and not r.get("rejected")]
+    typical = percentile(latencies, 50)
+    if typical is None:
+        return wait_seconds
+    return min(wait_seconds, typical)
+
+# 複数カテゴリの初回質問を1回の呼び出しでまとめて生成する関数
+async def agenerate_opening_questions(llm, rules, questions, evaluation_points_list, history):
+    """
+    Args:
+        llm: 設定済みLangChain LLMインスタンス
+        rules (str): 面接ルールとユーザープロフィールの組み合わせ
+        questions (list): 対象カテゴリ（questions_list の要素）のリスト
+        evaluation_points_list (dict): 評価ポイントの辞書
+        history (str): これまでの会話履歴（自己紹介を含む）
+        
+    Returns:
+        list: カテゴリ順の質問文のリスト（形式不正のカテゴリや、response_format に非対応の場合は None）
+    """
+    rendered = get_rendered_prompts()
+    
+    categories = "\n\n".join(
+        f"【カテゴリ{i}】{q['title']}\n{q['content']}" for i, q in enumerate(questions, 1)
+    )
+    point_keys = []
+    for q in questions:
+        point_keys.extend(k for k in q["point_keys"] if k not in point_keys)
+    evaluation_points = render_evaluation_points(point_keys, evaluation_points_list)
+    
+    plan_prompt = rendered.get_template("QUESTION_TEMPLATE", OPENING_QUESTIONS_JSON_INSTRUCTION)
+    try:
+        output = await _ainvoke_prompt(
+            "opening_plan", plan_prompt, llm,
+            {
+                "rules": rules,
+                "question": OPENING_QUESTIONS_CONTENT.format(categories=categories),
+                "evaluation_points": evaluation_points,
+                "history": history
+            },
+            max_tokens=get_interview_plan_config()["max_tokens"],
+            response_format={"type": "json_object"}
+        )
+    except Exception as e:
+        if not _is_rejected_request_error(e):
+            raise
+        # 計画を使わず、各カテゴリの初回質問はその場で生成する
+        return [None] * len(questions)
+    
+    try:
+        planned = json.loads(output).get("questions")
+    except (ValueError, AttributeError):
+        planned = None
+    if not isinstance(planned, list):
+        return [None] * len(questions)
+    
+    planned = planned + [None] * (len(questions) - len(planned))
+    return [
+        parse_question_output(json.dumps({"question": q})) if isinstance(q, str) else None
+        for q in planned[:len(questions)]
+    ]
+
+# 複数カテゴリの初回質問を1回の呼び出しでまとめて生成する関数（同期版）
+def generate_opening_questions(llm, rules, questions, evaluation_points_list, history):
+    return run_coroutine(
+        lambda: agenerate_opening_questions(llm, rules, questions, evaluation_points_list, history), "opening_plan"
+    )
+
+# 事前生成した質問がその後の回答により不要になっていないかを判定する関数
+def is_planned_question_stale(question, answers_since_plan, threshold=None):
+    """
+    Args:
+        question (str): 事前生成した初回質問
+        answers_since_plan (list): 計画作成後のユーザーの回答
+        threshold (float): 語彙の重なりの閾値（省略時は設定値）
+        
+    Returns:
+        bool: 既に回答で触れられており作り直すべき場合 True
+    """
+    from answer_scorer import question_overlap
+    if threshold is None:
+        threshold = get_interview_plan_config()["stale_overlap"]
+    return question_overlap(question, answers_since_plan) >= threshold
+
+# 深掘り判定と深掘り質問のJSON出力を検証する関数
+def parse_judge_followup_output(output):
+    """
+    Args:
+        output (str): JSON形式で出力させたLLMの応答
+        
+    Returns:
+        tuple or None: ("Yes", 質問文) または ("No", None)。形式不正や判定が読み取れない場合は None
+    """
+    try:
+        data = json.loads(output)
+        need_followup = data["need_followup"]
+    except (ValueError, KeyError, TypeError):
+        return None
+    
+    if isinstance(need_followup, str):
+        # "maybe" など真偽が読み取れない文字列は No と見なさず、2回呼び出しで判定し直す
+        need_followup = {"true": True, "yes": True, "false": False, "no": False}.get(
+            need_followup.strip().lower()
+        )
+    if not isinstance(need_followup, bool):
+        return None
+    if not need_followup:
+        return "No", None
+    
+    question = parse_question_output(json.dumps({"question": data.get("question")}))
+    if question is None:
+        return None
+    return "Yes", question
+
+# 深掘り判定と深掘り質問の生成を1回の呼び出しで行う関数
+async def ajudge_and_generate_followup(llm, rules, evaluation_points, history):
+    """
+    Args:
+        llm: 設定済みLangChain LLMインスタンス
+        rules (str): 面接ルールとユーザープロフィールの組み合わせ
+        evaluation_points (str): 評価ポイントの説明文
+        history (str): これまでの会話履歴
+        
+    Returns:
+        tuple: (judge_result, followup_question)
+               judge_result は "Yes" または "No"、followup_question は "Yes" の場合のみ質問文
+               出力の形式が不正な場合や、バックエンドが response_format を受け付けない場合は
+               従来の judge_need_followup と generate_question の2回呼び出しで判定する
+    """
+    rendered = get_rendered_prompts()
+    
+    # 判定基準は JUDGE_TEMPLATE から取り出し、会話履歴は QUESTION_TEMPLATE 側で1回だけ送る
+    # 2回呼び出し時と同じ f-string 形式で展開し、エスケープされた {{ }} も同じ結果にする
+    judge_criteria = rendered.prompts["JUDGE_TEMPLATE"].format(history="（上記の会話履歴を参照）")
+    combined_prompt = rendered.get_template("QUESTION_TEMPLATE", JUDGE_FOLLOWUP_JSON_INSTRUCTION)
+    try:
+        output = await _ainvoke_prompt(
+            "judge_followup", combined_prompt, llm,
+            {
+                "rules": rules,
+                "question": JUDGE_FOLLOWUP_CONTENT.format(judge_criteria=judge_criteria),
+                "evaluation_points": evaluation_points,
+                "history": history
+            },
+            max_tokens=get_question_output_config()["max_tokens"],
+            response_format={"type": "json_object"}
+        )
+    except Exception as e:
+        if not _is_rejected_request_error(e):
+            raise
+    else:
+        result = parse_judge_followup_output(output)
+        if result is not None:
+            return result
+    
+    # 形式不正・response_format 非対応の場合は従来の2回呼び出しにフォールバック
+    judge_result = await ajudge_need_followup(llm, history)
+    if judge_result != "Yes":
+        return judge_result, None
+    return judge_result, await agenerate_question(llm, rules, FOLLOWUP_QUESTION_CONTENT, evaluation_points, history)
+
+# 深掘り判定と深掘り質問の生成を1回の呼び出しで行う関数（同期版）
+def judge_and_generate_followup(llm, rules, evaluation_points, history):
+    return run_coroutine(
+        lambda: ajudge_and_generate_followup(llm, rules, evaluation_points, history), "judge_followup"
+    )
 
 # 深掘り質問が必要かどうかをAIで判定する関数
-def judge_need_followup(llm, history):
+async def ajudge_need_followup(llm, history):
     """
     Args:
         llm: 設定済みLangChain LLMインスタンス
@@ -133,56 +610,67 @@ def judge_need_followup(llm, history):
     Returns:
         str: "Yes" または "No" のみを返す（深掘り必要か判定）
     """
-    from secrets_config import get_prompts_from_secrets
-    prompts = get_prompts_from_secrets()
-    
-    judge_prompt = ChatPromptTemplate.from_template(prompts["JUDGE_TEMPLATE"])
-    judge_chain = judge_prompt | llm | StrOutputParser()
+    judge_prompt = get_rendered_prompts().get_template("JUDGE_TEMPLATE")
     
-    return judge_chain.invoke({"history": history}).strip()
+    return (await _ainvoke_prompt("judge", judge_prompt, llm, {"history": history})).strip()
+
+# 深掘り質問が必要かどうかをAIで判定する関数（同期版）
+def judge_need_followup(llm, history):
+    return run_coroutine(lambda: ajudge_need_followup(llm, history), "judge")
+
+# フィードバック用の評価ポイント一覧を文字列で返す関数（プロンプト一式と同じ辞書ならレンダリング済みのものを使う）
+def _render_feedback_evaluation_points(rendered, evaluation_points_list):
+    if isinstance(evaluation_points_list, str):
+        return evaluation_points_list
+    if evaluation_points_list == rendered.prompts["evaluation_points_list"]:
+        return rendered.feedback_evaluation_points
+    return render_evaluation_points(list(evaluation_points_list), evaluation_points_list)
 
 # 面接全体のフィードバックをAIで生成する関数
-def generate_feedback(llm, evaluation_points_list, history):
+async def agenerate_feedback(llm, evaluation_points_list, history):
     """
     Args:
         llm: 設定済みLangChain LLMインスタンス
-        evaluation_points_list (dict): 評価ポイントの辞書（キー: 評価軸名、値: 説明）
+        evaluation_points_list (dict or str): 評価ポイントの辞書（キー: 評価軸名、値: 説明）、
+                                              またはレンダリング済みの評価ポイント一覧
         history (str): 面接全体の会話履歴
         
     Returns:
         str: 構造化されたフィードバックテキスト（合否結果、評価、総評を含む）
     """
-    from secrets_config import get_prompts_from_secrets
-    prompts = get_prompts_from_secrets()
-    
-    feedback_prompt = ChatPromptTemplate.from_template(prompts["FEEDBACK_TEMPLATE"])
-    feedback_chain = feedback_prompt | llm | StrOutputParser()
+    rendered = get_rendered_prompts()
+    feedback_prompt = rendered.get_template("FEEDBACK_TEMPLATE")
     
-    return feedback_chain.invoke({
-        "evaluation_points_list": evaluation_points_list,
-        "evaluation_format": prompts["EVALUATION_FORMAT"],
+    return await _ainvoke_prompt("feedback", feedback_prompt, llm, {
+        "evaluation_points_list": _render_feedback_evaluation_points(rendered, evaluation_points_list),
+        "evaluation_format": rendered.prompts["EVALUATION_FORMAT"],
         "history": history
     })
 
+# 面接全体のフィードバックをAIで生成する関数（同期版）
+def generate_feedback(llm, evaluation_points_list, history):
+    return run_coroutine(lambda: agenerate_feedback(llm, evaluation_points_list, history), "feedback")
+
 # 面接中断時の部分フィードバックをAIで生成する関数
-def generate_partial_feedback(llm, evaluation_points_list, history):
+async def agenerate_partial_feedback(llm, evaluation_points_list, history):
     """
     Args:
         llm: 設定済みLangChain LLMインスタンス
-        evaluation_points_list (dict): 評価ポイントの辞書
+        evaluation_points_list (dict or str): 評価ポイントの辞書、またはレンダリング済みの評価ポイント一覧
         history (str): 面接中断までの会話履歴
         
     Returns:
         str: 部分的なフィードバックテキスト（未回答項目は"評価なし"として表示）
     """
-    from secrets_config import get_prompts_from_secrets
-    prompts = get_prompts_from_secrets()
-    
-    feedback_prompt = ChatPromptTemplate.from_template(prompts["PARTIAL_FEEDBACK_TEMPLATE"])
-    feedback_chain = feedback_prompt | llm | StrOutputParser()
+    rendered = get_rendered_prompts()
+    feedback_prompt = rendered.get_template("PARTIAL_FEEDBACK_TEMPLATE")
     
-    return feedback_chain.invoke({
-        "evaluation_points_list": evaluation_points_list,
-        "evaluation_format": prompts["PARTIAL_EVALUATION_FORMAT"],
+    return await _ainvoke_prompt("partial_feedback", feedback_prompt, llm, {
+        "evaluation_points_list": _render_feedback_evaluation_points(rendered, evaluation_points_list),
+        "evaluation_format": rendered.prompts["PARTIAL_EVALUATION_FORMAT"],
         "history": history
     })
+
+# 面接中断時の部分フィードバックをAIで生成する関数（同期版）
+def generate_partial_feedback(llm, evaluation_points_list, history):
+    return run_coroutine(lambda: agenerate_partial_feedback(llm, evaluation_points_list, history), "partial_feedback")
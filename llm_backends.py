@@ -0,0 +1,195 @@
+"""
+LLMバックエンドのレジストリとルーティング
+secrets.toml の [llm_backends] で複数のOpenAI互換バックエンドを定義し、
+呼び出し種別（質問生成・深掘り判定・フィードバックなど）ごとに利用するバックエンドの順序を指定する。
+直近のレイテンシ（p95）とエラー率に基づいて順序を入れ替え、失敗時は次のバックエンドへ自動で切り替える。
+計測値の無い（または古くなった）バックエンドには、呼び出しの一部を割り当てて計測し直す。
+
+設定例:
+    [llm_backends.backends.openai]
+    model = "gpt-4o"
+    temperature = 0.7
+
+    [llm_backends.backends.local]
+    base_url = "http://localhost:8000/v1"
+    model = "llama-3-8b-instruct"
+    api_key = "dummy"
+
+    [llm_backends.routes]
+    question = ["openai"]
+    judge = ["local", "openai"]
+    feedback = ["openai"]
+    # validate・default など指定しなかったルートと既定のバックエンド（gpt-4o / gpt-4o-mini）は
+    # 既定値のまま残るため、APIキーの検証は引き続き gpt-4o-mini（max_tokens=10）で行われる
+    # validate = ["gpt-4o-mini"]
+    # judge_followup（深掘り判定＋質問の一括生成）・opening_plan（面接計画）・personalize（質問バンクの調整）は
+    # 利用者に見せる質問を生成するため question のルートを使う（個別に指定した場合はそちらを優先）
+"""
+
+import threading
+import time
+
+from langchain_openai import ChatOpenAI
+from llm_metrics import get_recent_calls, percentile
+
+# バックエンド設定の既定値（従来の gpt-4o / gpt-4o-mini 構成）
+DEFAULT_BACKEND_CONFIG = {
+    "backends": {
+        "gpt-4o": {"model": "gpt-4o", "temperature": 0.7},
+        "gpt-4o-mini": {"model": "gpt-4o-mini", "temperature": 0, "max_tokens": 10},
+    },
+    "routes": {
+        "default": ["gpt-4o"],
+        "validate": ["gpt-4o-mini"],
+    },
+    # "latency": 健全なバックエンドを直近p95の小さい順に並べ替える
+    # "priority": 設定順を維持し、不健全なバックエンドのみ後回しにする
+    "strategy": "latency",
+    # 健全性判定に使う直近の呼び出し件数
+    "health_window": 50,
+    # 健全性判定に使う記録の期間（秒）。これより古い記録は使わず、エラーが続いたバックエンドも期間経過後に再計測する
+    "health_window_seconds": 300,
+    # これ未満の件数しか無いバックエンドは計測値を使わず設定順で扱う
+    "min_samples": 5,
+    # 健全なバックエンドより後ろにある計測値の無いバックエンドを先頭で試す、呼び出し全体に対する割合の上限
+    "probe_ratio": 0.05,
+    # エラー率がこれを超えたバックエンドは後回しにする
+    "max_error_rate": 0.5,
+    "request_timeout": 60,
+    "max_retries": 1,
+}
+
+# ルートが指定されていない場合に、代わりに使う呼び出し種別のルート
+ROUTE_FALLBACKS = {
+    "judge_followup": "question",
+    "opening_plan": "question",
+    "personalize": "question",
+}
+
+
+# バックエンド設定を取得する関数
+def get_backend_config():
+    from secrets_config import get_config_section
+    config = get_config_section("llm_backends", DEFAULT_BACKEND_CONFIG)
+    # backends と routes は既定値の上にマージし、secrets で一部だけ定義しても既定のバックエンド・ルートを残す
+    # （TOMLのテーブルは通常の辞書に変換）
+    backends = {name: dict(spec) for name, spec in DEFAULT_BACKEND_CONFIG["backends"].items()}
+    for name, spec in dict(config["backends"]).items():
+        backends[name] = dict(backends.get(name, {}), **dict(spec))
+    routes = {name: list(route) for name, route in DEFAULT_BACKEND_CONFIG["routes"].items()}
+    routes.update({name: list(route) for name, route in dict(config["routes"]).items()})
+    config["backends"] = backends
+    config["routes"] = routes
+    return config
+
+
+# 計測値の無いバックエンドを試す割合を上限内に抑えるための予算管理（プロセス共通、呼び出し種別ごと）
+class ProbeBudget:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._probes = {}
+
+    # 1回分の呼び出しを記録し、計測用に割り当ててよければ True を返す関数
+    def try_acquire(self, call_type, ratio):
+        with self._lock:
+            calls = self._calls[call_type] = self._calls.get(call_type, 0) + 1
+            probes = self._probes.get(call_type, 0)
+            if probes + 1 > ratio * calls:
+                return False
+            self._probes[call_type] = probes + 1
+            return True
+
+_probe_budget = ProbeBudget()
+
+
+# 呼び出し種別ごとにバックエンドを選択するルーター
+class LLMRouter:
+    """
+    setup_llm が返すLLMの代わりに interview_logic の各関数へ渡すオブジェクト。
+    呼び出し種別に応じたバックエンドの候補を、健全性順に返す。
+    """
+
+    def __init__(self, api_key, config=None):
+        self.api_key = api_key
+        self.config = config or get_backend_config()
+        # 非同期クライアントはイベントループに紐づくため、ainvoke は llm_runtime の共有イベントループ上でのみ行う
+        self._models = {}
+
+    # バックエンド名に対応するLangChainのLLMインスタンスを取得する関数
+    def get_model(self, name):
+        if name not in self._models:
+            spec = dict(self.config["backends"][name])
+            kwargs = {
+                "model": spec.pop("model"),
+                "temperature": spec.pop("temperature", 0.7),
+                "openai_api_key": spec.pop("api_key", None) or self.api_key,
+                "request_timeout": spec.pop("request_timeout", self.config["request_timeout"]),
+                "max_retries": spec.pop("max_retries", self.config["max_retries"]),
+            }
+            base_url = spec.pop("base_url", None)
+            if base_url:
+                kwargs["openai_api_base"] = base_url
+            kwargs.update(spec)
+            self._models[name] = ChatOpenAI(**kwargs)
+        return self._models[name]
+
+    # 呼び出し種別に設定されたバックエンド名の一覧を返す関数
+    def get_route(self, call_type):
+        routes = self.config["routes"]
+        route = (
+            routes.get(call_type)
+            or routes.get(ROUTE_FALLBACKS.get(call_type))
+            or routes.get("default")
+            or list(self.config["backends"])[:1]
+        )
+        return list(route)
+
+    # バックエンドの直近の健全性（p95レイテンシ・エラー率）を返す関数
+    def get_health(self, name, call_type):
+        since = time.time() - float(self.config["health_window_seconds"])
+        # リクエスト内容を受け付けなかった記録（rejected）はバックエンドの健全性に含めない
+        records = [
+            r for r in get_recent_calls(call_type, backend=name)
+            if r["timestamp"] >= since and not r.get("rejected")
+        ][-int(self.config["health_window"]):]
+        if len(records) < int(self.config["min_samples"]):
+            return None
+        errors = [r for r in records if r.get("error")]
+        return {
+            "latency_p95": percentile([r["latency"] for r in records if not r.get("error")], 95),
+            "error_rate": len(errors) / len(records),
+        }
+
+    # 呼び出し種別に対して試行するバックエンドを優先順に返す関数
+    def candidates(self, call_type):
+        """
+        "latency" では、健全なバックエンドを直近p95の小さい順に並べる。
+        計測値が無いバックエンドは、設定上それより前に健全なバックエンドが無い場合のみ先に試して計測を溜め、
+        それ以外は設定順のまま健全なバックエンドの後ろに置く（安価な優先バックエンドから高価な予備へ流れないように）。
+        ただし呼び出しの probe_ratio までは、後ろに置いた計測値の無いバックエンドを先頭で試して計測を溜める。
+        エラー率が高いバックエンドは最後に回す（記録が health_window_seconds より古くなると計測値の無い扱いに戻る）。
+        """
+        max_error_rate = float(self.config["max_error_rate"])
+        leading, healthy, unmeasured, unhealthy = [], [], [], []
+        route = self.get_route(call_type)
+        for index, name in enumerate(route):
+            health = self.get_health(name, call_type)
+            if health is None:
+                (unmeasured if healthy else leading).append(name)
+            elif health["error_rate"] > max_error_rate:
+                unhealthy.append(name)
+            else:
+                healthy.append((health["latency_p95"], index, name))
+
+        if self.config["strategy"] == "priority":
+            # 設定順を維持し、不健全なバックエンドのみ後回しにする
+            return [name for name in route if name not in unhealthy] + unhealthy
+
+        healthy.sort(key=lambda item: (item[0] if item[0] is not None else float("inf"), item[1]))
+        ordered = leading + [name for _, _, name in healthy] + unmeasured + unhealthy
+        if unmeasured and _probe_budget.try_acquire(call_type, float(self.config["probe_ratio"])):
+            # 計測値の無いバックエンドを先頭で試す（失敗した場合は通常の順序へ切り替わる）
+            ordered.remove(unmeasured[0])
+            ordered.insert(0, unmeasured[0])
+        return ordered
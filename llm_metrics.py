@@ -0,0 +1,116 @@
+"""
+LLM呼び出しごとのメトリクス（レイテンシ・トークン数）を記録・集計するモジュール
+プロセス内に直近の呼び出しを保持し、設定があればJSONLファイルにも追記する
+"""
+
+import json
+import threading
+import time
+from collections import deque
+
+# メトリクス記録の既定設定（secrets.toml の [llm_metrics] で上書き可能）
+DEFAULT_METRICS_CONFIG = {
+    # 呼び出し記録をJSONLで追記するファイルパス（空文字なら記録しない）
+    "log_path": "",
+    # プロセス内に保持する直近の呼び出し件数
+    "history_size": 2000,
+}
+
+_lock = threading.Lock()
+_records = None
+_config = None
+
+
+# メトリクス設定を取得する関数（初回のみsecretsを読み込む）
+def get_metrics_config():
+    global _config
+    if _config is None:
+        from secrets_config import get_config_section
+        _config = get_config_section("llm_metrics", DEFAULT_METRICS_CONFIG)
+    return _config
+
+# 呼び出し記録用のバッファを取得する関数
+def _get_records():
+    global _records
+    if _records is None:
+        _records = deque(maxlen=int(get_metrics_config()["history_size"]))
+    return _records
+
+# LLM呼び出し1回分のメトリクスを記録する関数
+def record_call(call_type, latency, prompt_tokens=None, completion_tokens=None, **attributes):
+    """
+    Args:
+        call_type (str): 呼び出し種別（"question", "judge", "feedback" など）
+        latency (float): 呼び出しにかかった秒数
+        prompt_tokens (int): 入力トークン数（取得できない場合は None）
+        completion_tokens (int): 出力トークン数（取得できない場合は None）
+        **attributes: 出力モードやエラー有無などの付加情報
+
+    Returns:
+        dict: 記録した内容
+    """
+    record = {
+        "timestamp": time.time(),
+        "call_type": call_type,
+        "latency": latency,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+    }
+    record.update(attributes)
+
+    with _lock:
+        _get_records().append(record)
+        log_path = get_metrics_config()["log_path"]
+        if log_path:
+            with open(log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return record
+
+# 直近の呼び出し記録を取得する関数
+def get_recent_calls(call_type=None, **filters):
+    with _lock:
+        records = list(_get_records())
+    if call_type is not None:
+        records = [r for r in records if r["call_type"] == call_type]
+    for key, value in filters.items():
+        records = [r for r in records if r.get(key) == value]
+    return records
+
+# 数値リストのパーセンタイルを計算する関数（線形補間）
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+# 呼び出し記録を集計する関数
+def summarize(records):
+    """
+    Args:
+        records (list): record_call で記録した辞書のリスト
+
+    Returns:
+        dict: 件数、レイテンシ（p50/p95/p99）、平均トークン数、エラー率
+    """
+    latencies = [r["latency"] for r in records]
+    prompt_tokens = [r["prompt_tokens"] for r in records if r.get("prompt_tokens") is not None]
+    completion_tokens = [r["completion_tokens"] for r in records if r.get("completion_tokens") is not None]
+    errors = [r for r in records if r.get("error")]
+
+    return {
+        "count": len(records),
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_p99": percentile(latencies, 99),
+        "avg_prompt_tokens": sum(prompt_tokens) / len(prompt_tokens) if prompt_tokens else None,
+        "avg_completion_tokens": sum(completion_tokens) / len(completion_tokens) if completion_tokens else None,
+        "error_rate": len(errors) / len(records) if records else 0.0,
+    }
+
+# 記録をすべて破棄する関数（ベンチマーク用）
+def reset_metrics():
+    with _lock:
+        _get_records().clear()
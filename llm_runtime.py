@@ -0,0 +1,324 @@
+"""
+LLM呼び出しの実行基盤（中断・ヘッジリクエスト・同時実行数の制限）
+LLM呼び出しを共有イベントループ上のタスクとして実行し、呼び出し元は短い間隔で待機しながら
+中断要求（画面遷移・やり直し）を確認する。中断時はタスクをキャンセルして通信ごと打ち切る。
+レイテンシが重要な呼び出しでは、直近p90を超えても応答が無い場合に同一リクエストを追加で送り、
+先に返った方を採用する（ヘッジ）。追加リクエストの割合には上限を設ける。
+呼び出し種別ごとの同時実行数は、共有イベントループ上のセマフォで制限する。
+非同期APIを別のイベントループ（asyncio.run など）から await した場合も、LLMリクエストは共有イベントループで実行する。
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from llm_metrics import get_recent_calls, percentile
+from tracing import increment_counter
+
+# 実行基盤の既定設定（secrets.toml の [llm_runtime] で上書き可能）
+DEFAULT_RUNTIME_CONFIG = {
+    # 中断要求を確認する間隔（秒）
+    "poll_interval": 0.1,
+    # ヘッジを行う呼び出し種別（画面の待ち時間に直結するもの。opening_plan はバックグラウンドのため対象外）
+    "hedge_call_types": ["question", "judge", "judge_followup", "personalize"],
+    # この百分位のレイテンシを超えたら追加リクエストを送る
+    "hedge_percentile": 90,
+    # ヘッジ判定に必要な直近の計測件数
+    "hedge_min_samples": 20,
+    # 追加リクエストまでの最短待ち時間（秒）
+    "hedge_min_delay": 0.5,
+    # 全呼び出しに対する追加リクエストの割合の上限
+    "hedge_max_ratio": 0.1,
+    # 呼び出し種別ごとの同時実行数の上限（例: {"feedback": 20}、"default" は未指定の種別に適用、0 は無制限）
+    "concurrency_limits": {},
+}
+
+_loop = None
+_loop_lock = threading.Lock()
+_config = None
+_semaphores = {}
+_call_scope = contextvars.ContextVar("llm_call_scope", default=None)
+
+
+# LLM呼び出しが中断されたことを表す例外
+class LLMCallCancelled(Exception):
+    pass
+
+
+# 実行中のLLM呼び出しをまとめて中断するためのトークン（セッションごとに1つ）
+class CancelToken:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures = set()
+
+    def register(self, future):
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._discard)
+
+    def _discard(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    # 登録されている実行中の呼び出しをすべて中断する関数
+    def cancel(self):
+        with self._lock:
+            futures = list(self._futures)
+        for future in futures:
+            future.cancel()
+        if futures:
+            increment_counter("mensetsu_llm_cancellations_total", len(futures))
+        return len(futures)
+
+
+# 追加リクエストの割合を上限内に抑えるための予算管理
+class HedgeBudget:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def record_call(self):
+        with self._lock:
+            self.calls += 1
+
+    def try_acquire(self, max_ratio):
+        with self._lock:
+            if self.hedges + 1 > max_ratio * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+    def record_win(self):
+        with self._lock:
+            self.hedge_wins += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "hedge_rate": self.hedges / self.calls if self.calls else 0.0,
+            }
+
+_budget = HedgeBudget()
+
+
+# 実行基盤の設定を取得する関数
+def get_runtime_config():
+    global _config
+    if _config is None:
+        from secrets_config import get_config_section
+        _config = get_config_section("llm_runtime", DEFAULT_RUNTIME_CONFIG)
+        _config["concurrency_limits"] = dict(_config["concurrency_limits"])
+    return _config
+
+# 実行基盤の設定を一部上書きする関数（ベンチマーク用）
+def configure_runtime(**overrides):
+    global _config
+    _config = dict(get_runtime_config(), **overrides)
+    # 同時実行数の上限が変わった場合に備えてセマフォを作り直す
+    _semaphores.clear()
+
+# ヘッジの統計（呼び出し数・追加リクエスト数・採用数）を返す関数
+def get_hedge_stats():
+    return _budget.stats()
+
+# ヘッジの統計をリセットする関数（ベンチマーク用）
+def reset_hedge_stats():
+    global _budget
+    _budget = HedgeBudget()
+
+# プロセス共通のイベントループを取得する関数（初回のみ専用スレッドで起動）
+def get_event_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="llm-event-loop", daemon=True).start()
+            _loop = loop
+    return _loop
+
+# LLM呼び出しを中断可能にするスコープ
+@contextmanager
+def llm_call_scope(cancel_token=None, poll=None):
+    """
+    Args:
+        cancel_token (CancelToken): reset/restart時に呼び出しを中断するためのトークン
+        poll (callable): 待機中に定期的に呼ぶ関数（例外を送出すると呼び出しを中断する）
+    """
+    reset_token = _call_scope.set((cancel_token, poll))
+    try:
+        yield
+    finally:
+        _call_scope.reset(reset_token)
+
+# ヘッジ用の待ち時間（直近の指定百分位レイテンシ）を返す関数
+def _hedge_delay(call_type, config):
+    if call_type not in config["hedge_call_types"]:
+        return None
+    latencies = [r["latency"] for r in get_recent_calls(call_type)
+                 if not r.get("error") and not r.get("rejected")]
+    if len(latencies) < int(config["hedge_min_samples"]):
+        return None
+    return max(float(config["hedge_min_delay"]), percentile(latencies, config["hedge_percentile"]))
+
+# 必要に応じて追加リクエストを送り、先に成功した結果を返すコルーチン
+async def _run_hedged(coroutine_factory, hedge_delay, max_ratio):
+    budget = _budget
+    budget.record_call()
+    primary = asyncio.ensure_future(coroutine_factory())
+    if hedge_delay is None:
+        return await primary
+
+    done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+    if done or not budget.try_acquire(max_ratio):
+        return await primary
+
+    increment_counter("mensetsu_llm_hedges_total")
+    hedge = asyncio.ensure_future(coroutine_factory())
+    pending = {primary, hedge}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        budget.record_win()
+                    return task.result()
+        # 両方失敗した場合は最初のリクエストの例外を送出
+        return primary.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+# 呼び出し種別の同時実行数を制限するセマフォを返す関数（共有イベントループ上でのみ呼ぶ）
+def _get_semaphore(call_type, config):
+    if call_type not in _semaphores:
+        limits = config["concurrency_limits"]
+        limit = int(limits.get(call_type, limits.get("default", 0)) or 0)
+        _semaphores[call_type] = asyncio.Semaphore(limit) if limit > 0 else None
+    return _semaphores[call_type]
+
+# 1回分のLLMリクエストを、同時実行数の制限とヘッジを適用して実行するコルーチン
+async def arun_llm_call(coroutine_factory, call_type):
+    """
+    どのイベントループから await してもよい。セマフォとLLMクライアント（非同期クライアントは
+    最初に使ったイベントループに紐づく）は共有イベントループ上でのみ使うため、他のイベントループから
+    呼ばれた場合は処理を共有イベントループに渡して結果を待つ（await 側のキャンセルも引き継がれる）。
+
+    Args:
+        coroutine_factory (callable): LLM呼び出しのコルーチンを返す関数（ヘッジ時は2回呼ばれる）
+        call_type (str): 呼び出し種別
+
+    Returns:
+        コルーチンの戻り値
+    """
+    loop = get_event_loop()
+    if asyncio.get_running_loop() is not loop:
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(
+            _run_in_context(contextvars.copy_context(), lambda: _arun_llm_call(coroutine_factory, call_type)),
+            loop
+        ))
+    return await _arun_llm_call(coroutine_factory, call_type)
+
+# arun_llm_call の本体（共有イベントループ上でのみ実行する）
+async def _arun_llm_call(coroutine_factory, call_type):
+    config = get_runtime_config()
+    semaphore = _get_semaphore(call_type, config)
+    hedge_delay = _hedge_delay(call_type, config)
+    if semaphore is None:
+        return await _run_hedged(coroutine_factory, hedge_delay, float(config["hedge_max_ratio"]))
+    async with semaphore:
+        return await _run_hedged(coroutine_factory, hedge_delay, float(config["hedge_max_ratio"]))
+
+# 呼び出し元のコンテキスト（トレーシングの親スパンなど）を引き継いでコルーチンを実行する
+async def _run_in_context(context, coroutine_factory):
+    for var, value in context.items():
+        var.set(value)
+    return await coroutine_factory()
+
+# コルーチンを共有イベントループで実行し、中断要求を確認しながら結果を待つ関数（同期APIの実体）
+def run_coroutine(coroutine_factory, call_type):
+    """
+    Args:
+        coroutine_factory (callable): 実行するコルーチンを返す関数
+        call_type (str): 呼び出し種別（中断時のメッセージに使用）
+
+    Returns:
+        コルーチンの戻り値
+
+    Raises:
+        LLMCallCancelled: CancelToken により中断された場合
+    """
+    config = get_runtime_config()
+    cancel_token, poll = _call_scope.get() or (None, None)
+    future = asyncio.run_coroutine_threadsafe(
+        _run_in_context(contextvars.copy_context(), coroutine_factory),
+        get_event_loop()
+    )
+    if cancel_token is not None:
+        cancel_token.register(future)
+
+    try:
+        while True:
+            try:
+                return future.result(timeout=float(config["poll_interval"]))
+            except concurrent.futures.TimeoutError:
+                if poll is not None:
+                    # Streamlitの再実行要求などで例外が送出された場合は finally で通信を打ち切る
+                    poll()
+    except concurrent.futures.CancelledError:
+        raise LLMCallCancelled(f"{call_type} の呼び出しは中断されました")
+    finally:
+        if not future.done():
+            future.cancel()
+
+# 1回分のLLMリクエストを共有イベントループで実行し、結果を待つ関数
+def run_llm_call(coroutine_factory, call_type):
+    return run_coroutine(lambda: arun_llm_call(coroutine_factory, call_type), call_type)
+
+# コルーチンを共有イベントループでバックグラウンド実行し、Futureを返す関数（スレッドを占有しない）
+def submit_coroutine(coroutine_factory, cancel_token=None):
+    """
+    Args:
+        coroutine_factory (callable): 実行するコルーチンを返す関数（呼び出し元のコンテキストで実行される）
+        cancel_token (CancelToken): reset/restart時に中断するためのトークン
+
+    Returns:
+        concurrent.futures.Future: コルーチンの戻り値を返すFuture（cancel() で通信ごと打ち切る）
+    """
+    future = asyncio.run_coroutine_threadsafe(
+        _run_in_context(contextvars.copy_context(), coroutine_factory),
+        get_event_loop()
+    )
+    if cancel_token is not None:
+        cancel_token.register(future)
+    return future
+
+# バックグラウンド処理の完了を、中断要求を確認しながら待つ関数
+def wait_background(future, timeout):
+    """
+    Args:
+        future (concurrent.futures.Future): submit_coroutine が返したFuture
+        timeout (float): 待機する最大秒数
+
+    Returns:
+        Futureの結果（例外はそのまま送出。時間切れの場合は concurrent.futures.TimeoutError）
+    """
+    config = get_runtime_config()
+    _, poll = _call_scope.get() or (None, None)
+    deadline = time.monotonic() + float(timeout)
+    while True:
+        try:
+            return future.result(timeout=min(float(config["poll_interval"]), max(0.0, deadline - time.monotonic())))
+        except concurrent.futures.TimeoutError:
+            if time.monotonic() >= deadline:
+                raise
+            if poll is not None:
+                poll()
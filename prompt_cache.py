@@ -0,0 +1,166 @@
+"""
+プロンプト部品の事前レンダリングキャッシュ
+カテゴリごとの評価ポイント、フィードバック用の評価ポイント一覧、プロンプトテンプレートを
+プロンプト一式（prompts）のバージョンごとに1回だけ組み立て、トークン数（文字数からの概算）と合わせて保持する。
+再実行（rerun）やセッションをまたいで同じ文字列を作り直さないようにするためのもの。
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from langchain_core.prompts import ChatPromptTemplate
+
+# プロンプトキャッシュの既定設定（secrets.toml の [prompt_cache] で上書き可能）
+DEFAULT_PROMPT_CACHE_CONFIG = {
+    # 保持するプロンプト一式のバージョン数
+    "max_versions": 4,
+    # バージョンごとに保持するルールプロンプト（プロフィール別）の件数
+    "max_rules": 1024,
+}
+
+_cache = OrderedDict()
+# プロンプト一式のオブジェクトごとのレンダリング結果（同じオブジェクトならバージョンを計算し直さない）
+_by_identity = OrderedDict()
+_cache_lock = threading.Lock()
+_config = None
+
+
+# プロンプトキャッシュの設定を取得する関数
+def get_prompt_cache_config():
+    global _config
+    if _config is None:
+        from secrets_config import get_config_section
+        _config = get_config_section("prompt_cache", DEFAULT_PROMPT_CACHE_CONFIG)
+    return _config
+
+# テキストのトークン数を文字数から概算する関数（英数字は4文字、それ以外は1文字を1トークンとする上限寄りの見積もり）
+def estimate_tokens(text):
+    ascii_chars = sum(1 for c in text if ord(c) < 128)
+    return (ascii_chars + 3) // 4 + len(text) - ascii_chars
+
+# 評価ポイントを「- 評価軸：説明」の行で並べた文字列に変換する関数
+def render_evaluation_points(point_keys, evaluation_points_list):
+    """
+    Args:
+        point_keys (list): 評価軸キーのリスト（この順に並べる）
+        evaluation_points_list (dict): 評価ポイントの辞書
+
+    Returns:
+        str: 評価ポイントの説明文
+    """
+    return "\n".join([f"- {k}：{evaluation_points_list[k]}" for k in point_keys])
+
+# プロンプト一式から内容に基づくバージョン文字列を作る関数
+def get_prompt_version(prompts):
+    canonical = json.dumps(prompts, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+# プロンプト一式の1バージョン分のレンダリング結果
+class RenderedPrompts:
+    def __init__(self, version, prompts, config):
+        self.version = version
+        self.prompts = prompts
+        self._config = config
+        self._lock = threading.Lock()
+        self._rules = OrderedDict()
+        self._templates = {}
+
+        evaluation_points_list = prompts["evaluation_points_list"]
+        # questions_list と同じ順のカテゴリ別評価ポイント
+        self.category_evaluation_points = [
+            render_evaluation_points(q["point_keys"], evaluation_points_list)
+            for q in prompts["questions_list"]
+        ]
+        # フィードバック用の評価ポイント一覧（辞書の repr ではなく定義順の行形式）
+        self.feedback_evaluation_points = render_evaluation_points(
+            list(evaluation_points_list), evaluation_points_list
+        )
+        # 各部品のトークン数（バージョンごとに1回だけ計算し、再実行時には計算しない）
+        self.token_counts = {
+            "category_evaluation_points": [estimate_tokens(text) for text in self.category_evaluation_points],
+            "feedback_evaluation_points": estimate_tokens(self.feedback_evaluation_points),
+        }
+
+    # ユーザープロフィールに対するルールプロンプトを返す関数（プロフィールごとにキャッシュ）
+    def get_rules(self, profile):
+        key = tuple(str(profile.get(k, "")) for k in (
+            "age", "current_gyokai", "current_job", "role", "experience_years", "target_gyokai", "target_job"
+        ))
+        with self._lock:
+            if key in self._rules:
+                self._rules.move_to_end(key)
+                return self._rules[key]
+
+        rules = self.prompts["RULES_TEMPLATE"].format(
+            age=profile["age"],
+            current_gyokai=profile["current_gyokai"],
+            current_job=profile["current_job"],
+            role=profile["role"],
+            experience_years=profile["experience_years"],
+            target_gyokai=profile["target_gyokai"],
+            target_job=profile["target_job"]
+        )
+        with self._lock:
+            self._rules[key] = rules
+            while len(self._rules) > int(self._config["max_rules"]):
+                self._rules.popitem(last=False)
+        return rules
+
+    # プロンプト一式のテンプレート（必要に応じて追加指示を連結）を解析済みの形で返す関数
+    def get_template(self, name, suffix=""):
+        """
+        Args:
+            name (str): prompts のキー（"QUESTION_TEMPLATE" など）
+            suffix (str): テンプレート末尾に連結する追加指示
+
+        Returns:
+            ChatPromptTemplate: 解析済みのプロンプトテンプレート
+        """
+        key = (name, suffix)
+        template = self._templates.get(key)
+        if template is None:
+            template = ChatPromptTemplate.from_template(self.prompts[name] + suffix)
+            self._templates[key] = template
+        return template
+
+
+# プロンプト一式に対応するレンダリング結果を取得する関数（バージョンごとに1回だけ組み立てる）
+def get_rendered_prompts(prompts=None):
+    """
+    Args:
+        prompts (dict): get_prompts_from_secrets の戻り値（省略時は取得する。呼び出し後に変更しないこと）
+
+    Returns:
+        RenderedPrompts: レンダリング済みのプロンプト部品
+    """
+    if prompts is None:
+        from secrets_config import get_prompts_from_secrets
+        prompts = get_prompts_from_secrets()
+
+    # get_prompts_from_secrets は読み込み済みの同じオブジェクトを返すため、通常はここで返る
+    with _cache_lock:
+        entry = _by_identity.get(id(prompts))
+        if entry is not None and entry[0] is prompts:
+            _by_identity.move_to_end(id(prompts))
+            return entry[1]
+
+    config = get_prompt_cache_config()
+    version = get_prompt_version(prompts)
+    with _cache_lock:
+        rendered = _cache.get(version)
+        if rendered is not None:
+            _cache.move_to_end(version)
+    if rendered is None:
+        rendered = RenderedPrompts(version, prompts, config)
+    with _cache_lock:
+        rendered = _cache.setdefault(version, rendered)
+        while len(_cache) > int(config["max_versions"]):
+            _cache.popitem(last=False)
+        # 参照を保持して id の再利用による取り違えを防ぐ
+        _by_identity[id(prompts)] = (prompts, rendered)
+        while len(_by_identity) > int(config["max_versions"]):
+            _by_identity.popitem(last=False)
+    return rendered
@@ -0,0 +1,180 @@
+"""
+事前生成した初回質問（オープニング質問）のインデックス
+よくある志望業界・職種・役割・カテゴリの組み合わせについて scripts/build_question_bank.py で
+初回質問を事前に生成しておき、自己紹介直後の質問生成をLLMの往復なしで返す。
+インデックスはLRUで保持し、ヒット率を記録する。見つからない場合は従来通りその場で生成する。
+"""
+
+import json
+import os
+import random
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from tracing import increment_counter
+
+# 質問バンクの既定設定（secrets.toml の [question_bank] で上書き可能）
+DEFAULT_QUESTION_BANK_CONFIG = {
+    "enabled": True,
+    "index_path": "question_bank.json",
+    # メモリ上に保持するエントリ数の上限（超えた分は最も使われていないものから破棄）
+    "capacity": 1000,
+    # この一致度以上のエントリがあればヒットとみなす
+    "min_match_score": 0.8,
+    # ヒットした質問を自己紹介に合わせて1回だけLLMで調整するか（プロンプトに PERSONALIZE_TEMPLATE が必要）
+    "personalize": False,
+}
+
+# 一致度の計算に使う項目ごとの重み
+MATCH_WEIGHTS = {
+    "target_gyokai": 0.4,
+    "target_job": 0.4,
+    "role": 0.1,
+    "experience_band": 0.1,
+}
+
+_bank = None
+_bank_lock = threading.Lock()
+
+
+# 表記ゆれを吸収するために文字列を正規化する関数
+def normalize_text(text):
+    return re.sub(r'\s+', '', unicodedata.normalize("NFKC", str(text or ""))).lower()
+
+# 経験年数の入力（例:「3年」「5年目」）を帯に丸める関数
+def experience_band(experience_years):
+    match = re.search(r'\d+', unicodedata.normalize("NFKC", str(experience_years or "")))
+    if not match:
+        return "unknown"
+    years = int(match.group())
+    if years <= 2:
+        return "0-2"
+    if years <= 5:
+        return "3-5"
+    if years <= 10:
+        return "6-10"
+    return "10+"
+
+# プロフィールとカテゴリからインデックスのキーを作る関数
+def make_key(profile, category):
+    return (
+        normalize_text(profile.get("target_gyokai")),
+        normalize_text(profile.get("target_job")),
+        normalize_text(profile.get("role")),
+        experience_band(profile.get("experience_years")),
+        normalize_text(category),
+    )
+
+# 2つの正規化済み文字列の一致度（完全一致1.0、部分一致0.5）を返す関数
+def _field_similarity(a, b):
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    if a in b or b in a:
+        return 0.5
+    return 0.0
+
+
+# 事前生成した初回質問のLRUインデックス
+class QuestionBank:
+    def __init__(self, config):
+        self.config = config
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # インデックスファイルからエントリを読み込む関数
+    def load(self, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        # ファイル先頭ほど一般的な組み合わせとして扱い、後から読み込んだものが先に破棄されないよう逆順に追加
+        for entry in reversed(data.get("entries", [])):
+            self.add(entry, entry["category"], entry["questions"])
+
+    # エントリを追加する関数（容量超過時は最も使われていないものを破棄）
+    def add(self, profile, category, questions):
+        key = make_key(profile, category)
+        with self._lock:
+            self._entries[key] = list(questions)
+            self._entries.move_to_end(key, last=False)
+            while len(self._entries) > int(self.config["capacity"]):
+                self._entries.popitem(last=True)
+                self.evictions += 1
+
+    # プロフィールとカテゴリに最も近い事前生成質問を返す関数
+    def lookup(self, profile, category):
+        """
+        Args:
+            profile (dict): ユーザープロフィール
+            category (str): 質問カテゴリのタイトル（questions_list の title）
+
+        Returns:
+            str or None: 事前生成した質問文（一致度が閾値未満なら None）
+        """
+        key = make_key(profile, category)
+        with self._lock:
+            best_key, best_score = None, 0.0
+            if key in self._entries:
+                best_key, best_score = key, 1.0
+            else:
+                for candidate in self._entries:
+                    if candidate[4] != key[4]:
+                        continue
+                    score = sum(
+                        weight * _field_similarity(candidate[i], key[i])
+                        for i, weight in enumerate(MATCH_WEIGHTS.values())
+                    )
+                    if score > best_score:
+                        best_key, best_score = candidate, score
+
+            if best_key is None or best_score < float(self.config["min_match_score"]):
+                self.misses += 1
+                increment_counter("mensetsu_question_bank_lookups_total", result="miss")
+                return None
+
+            self._entries.move_to_end(best_key, last=False)
+            self.hits += 1
+            increment_counter("mensetsu_question_bank_lookups_total", result="hit")
+            return random.choice(self._entries[best_key])
+
+    # ヒット率などの統計を返す関数
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# 質問バンクの設定を取得する関数
+def get_question_bank_config():
+    from secrets_config import get_config_section
+    return get_config_section("question_bank", DEFAULT_QUESTION_BANK_CONFIG)
+
+# プロセス共通の質問バンクを取得する関数
+def get_question_bank():
+    """
+    Returns:
+        QuestionBank or None: 無効化されている、またはインデックスファイルが無い場合は None
+        （インデックスファイルが無い場合は次回呼び出し時に再確認するため、後から配置すれば読み込まれる）
+    """
+    global _bank
+    with _bank_lock:
+        if _bank is None:
+            config = get_question_bank_config()
+            if not config["enabled"]:
+                _bank = False
+            elif not os.path.exists(config["index_path"]):
+                return None
+            else:
+                _bank = QuestionBank(config)
+                _bank.load(config["index_path"])
+    return _bank or None
@@ -11,10 +11,23 @@ from interview_logic import (
     get_history_text,
     generate_question,
     judge_need_followup,
+    judge_and_generate_followup,
+    get_question_output_config,
+    FOLLOWUP_QUESTION_CONTENT,
     generate_feedback,
     generate_partial_feedback,
+    personalize_question,
+    agenerate_opening_questions,
+    get_interview_plan_config,
+    get_plan_wait_seconds,
+    is_planned_question_stale,
     get_rules
 )
+from answer_scorer import get_scorer_config, decide_followup_locally
+from tracing import traced, set_span_attributes
+from question_bank import get_question_bank
+from prompt_cache import get_rendered_prompts
+from llm_runtime import CancelToken, llm_call_scope, submit_coroutine, wait_background
 
 # ページ設定
 st.set_page_config(
@@ -41,6 +54,8 @@ def init_session_state():
         st.session_state.api_key = ""
     if "llm" not in st.session_state:
         st.session_state.llm = None
+    if "llm_cancel_token" not in st.session_state:
+        st.session_state.llm_cancel_token = CancelToken()
 
 # チャット履歴にメッセージを追加する関数
 def add_message(role, content):
@@ -49,8 +64,20 @@ def add_message(role, content):
         "content": content
     })
 
+# 実行中のLLM呼び出しを中断する関数
+def cancel_outstanding_llm_calls():
+    cancel_token = st.session_state.get("llm_cancel_token")
+    if cancel_token is not None:
+        cancel_token.cancel()
+
+# LLM呼び出しの待機中に、ボタン操作などによる再実行要求を検知する関数
+def check_rerun_requested():
+    # session_state へのアクセス時にStreamlitが保留中の再実行・停止要求を処理し、例外を送出する
+    return "llm_cancel_token" in st.session_state
+
 # 面接セッションを完全にリセットする関数
 def reset_interview_session():
+    cancel_outstanding_llm_calls()
     for key in list(st.session_state.keys()):
         del st.session_state[key]
 
@@ -61,7 +88,8 @@ def restart_interview():
     saved_api_key = st.session_state.get("api_key", "")
     saved_llm = st.session_state.get("llm", None)
     
-    # セッション状態をリセット
+    # 実行中のLLM呼び出しを中断してからセッション状態をリセット
+    cancel_outstanding_llm_calls()
     for key in list(st.session_state.keys()):
         del st.session_state[key]
     
@@ -73,41 +101,66 @@ def restart_interview():
 
 # フィードバック段階にスキップする関数（面接中断時用）
 def skip_to_feedback():
+    cancel_outstanding_llm_calls()
     st.session_state.current_stage = "feedback"
     st.session_state.is_interrupted = True
 
-# 質問文から余計な履歴を除去して純粋な質問のみを抽出する関数
-def clean_question_text(question_text):
-    # 「面接官：」以降の部分を抽出
-    if "面接官：" in question_text:
-        # 最後の「面接官：」以降を取得
-        parts = question_text.split("面接官：")
-        if len(parts) > 1:
-            return parts[-1].strip()
-    
-    # 「面接官：」がない場合、改行で分割して最後の質問部分を取得
-    lines = question_text.strip().split('\n')
-    
-    # 自己紹介や履歴部分を除去して質問部分を探す
-    for i in range(len(lines) - 1, -1, -1):
-        line = lines[i].strip()
-        # 質問文の特徴を持つ行を探す
-        if line and ('？' in line or 'か？' in line or 'ですか' in line or 'ください' in line):
-            # その行から質問部分を抽出
-            if '？' in line:
-                question_parts = line.split('？')
-                if len(question_parts) >= 2:
-                    # 最後の「？」までを質問として扱う
-                    return '？'.join(question_parts[:-1]) + '？'
-            return line
-    
-    # 最後の手段として、最後の文を返す
-    if lines:
-        return lines[-1].strip()
-    
-    return question_text.strip()
+# 自己紹介の直後に、2つ目以降のカテゴリの初回質問をバックグラウンドで一括生成する関数
+def start_interview_plan():
+    plan_config = get_interview_plan_config()
+    prompts = get_prompts_from_secrets()
+    questions_list = prompts["questions_list"]
+    if not plan_config["enabled"] or len(questions_list) < 2:
+        return
+    
+    # 1つ目のカテゴリはすぐに表示するため従来通り生成し、残りを回答中に共有イベントループ上で生成しておく
+    # （session_state は別スレッドから参照できないため、引数はここで確定させる）
+    llm = st.session_state.llm
+    rules = get_rules(st.session_state.profile)
+    history = get_history_text(st.session_state.chat_history)
+    st.session_state.interview_plan = submit_coroutine(
+        lambda: agenerate_opening_questions(
+            llm, rules, questions_list[1:], prompts["evaluation_points_list"], history
+        ),
+        cancel_token=st.session_state.llm_cancel_token
+    )
+    st.session_state.interview_plan_history_len = len(st.session_state.chat_history)
+
+# 面接計画が間に合わず、初回質問を質問バンクやその場での生成で用意した場合に、生成中の計画を中断する関数
+def cancel_pending_interview_plan():
+    plan = st.session_state.get("interview_plan")
+    if plan is not None and not plan.done():
+        # 完了していない計画は以降のカテゴリでも待ち時間の原因になるため、通信ごと打ち切って使わない
+        plan.cancel()
+        st.session_state.interview_plan = None
+
+# 面接計画から指定カテゴリの初回質問を取り出す関数（使えない場合は None）
+def get_planned_question(question_index):
+    plan = st.session_state.get("interview_plan")
+    if plan is None or question_index == 0:
+        return None
+    
+    try:
+        planned = wait_background(plan, get_plan_wait_seconds())
+    except Exception:
+        return None
+    
+    question = planned[question_index - 1]
+    if question is None:
+        return None
+    
+    # 計画作成後の回答で既に語られている内容であれば作り直す
+    answers_since_plan = [
+        message["content"]
+        for message in st.session_state.chat_history[st.session_state.interview_plan_history_len:]
+        if message["role"] == "user"
+    ]
+    if is_planned_question_stale(question, answers_since_plan):
+        return None
+    return question
 
 # フィードバックテキストを解析してStreamlitに綺麗に表示する関数
+@traced()
 def format_feedback_display(feedback_text):
     lines = feedback_text.split('\n')
     
@@ -183,36 +236,41 @@ def format_feedback_display(feedback_text):
         st.markdown(evaluation_text)
 
 # メイン関数
+@traced("rerun")
 def main():
     init_session_state()
+    set_span_attributes(stage=st.session_state.current_stage)
     
     st.title("👨‍💼 面接ロールプレイ")
     
-    # ウェルカム画面
-    if st.session_state.current_stage == "welcome":
-        show_welcome_screen()
+    # 画面遷移・やり直しの操作があった場合は実行中のLLM呼び出しを中断する
+    with llm_call_scope(st.session_state.llm_cancel_token, poll=check_rerun_requested):
+        # ウェルカム画面
+        if st.session_state.current_stage == "welcome":
+            show_welcome_screen()
     
-    # APIキー入力段階
-    elif st.session_state.current_stage == "api_key":
-        show_api_key_form()
+        # APIキー入力段階
+        elif st.session_state.current_stage == "api_key":
+            show_api_key_form()
     
-    # プロフィール入力段階
-    elif st.session_state.current_stage == "profile":
-        show_profile_form()
+        # プロフィール入力段階
+        elif st.session_state.current_stage == "profile":
+            show_profile_form()
     
-    # 自己紹介段階
-    elif st.session_state.current_stage == "intro":
-        show_intro_stage()
+        # 自己紹介段階
+        elif st.session_state.current_stage == "intro":
+            show_intro_stage()
     
-    # 質問段階
-    elif st.session_state.current_stage == "questions":
-        show_question_stage()
+        # 質問段階
+        elif st.session_state.current_stage == "questions":
+            show_question_stage()
     
-    # フィードバック段階
-    elif st.session_state.current_stage == "feedback":
-        show_feedback_stage()
+        # フィードバック段階
+        elif st.session_state.current_stage == "feedback":
+            show_feedback_stage()
 
 # アプリのウェルカム画面を表示する関数
+@traced()
 def show_welcome_screen():
     st.header("面接ロールプレイシステムへようこそ")
     
@@ -293,6 +351,7 @@ def show_welcome_screen():
             st.rerun()
 
 # OpenAI APIキー入力フォームを表示する関数
+@traced()
 def show_api_key_form():
     st.header("OpenAI APIキー設定")
     
@@ -349,6 +408,7 @@ def show_api_key_form():
                 st.error("APIキーを入力してください")
 
 # ユーザーのプロフィール情報入力フォームを表示する関数
+@traced()
 def show_profile_form():
     st.header("プロフィール入力")
     
@@ -383,6 +443,7 @@ def show_profile_form():
                 st.error("すべての項目を入力してください。")
 
 # 自己紹介ステージを表示する関数
+@traced()
 def show_intro_stage():
     st.header("自己紹介")
         
@@ -401,6 +462,7 @@ def show_intro_stage():
             add_message("assistant", intro_message)
             add_message("user", user_intro)
             st.session_state.intro_given = True
+            start_interview_plan()
             st.session_state.current_stage = "questions"
             st.rerun()
 
@@ -443,11 +505,13 @@ def show_intro_stage():
                 st.rerun()
 
 # 面接質問ステージを表示する関数（メインの面接フロー）
+@traced()
 def show_question_stage():
     st.header("面接質問")
     
     # プロンプトデータを取得
     prompts = get_prompts_from_secrets()
+    rendered_prompts = get_rendered_prompts(prompts)
     questions_list = prompts["questions_list"]
     evaluation_points_list = prompts["evaluation_points_list"]
     
@@ -466,26 +530,43 @@ def show_question_stage():
         selected_q = questions_list[st.session_state.current_question]
         
         st.subheader(f"🟦 {selected_q['title']}")
+        set_span_attributes(category=selected_q["title"], depth=st.session_state.depth_count)
         
-        evaluation_points = "\n".join(
-            [f"- {k}：{evaluation_points_list[k]}" for k in selected_q["point_keys"]]
-        )
+        # 評価ポイントはプロンプト一式のバージョンごとに事前レンダリング済みのものを使う
+        evaluation_points = rendered_prompts.category_evaluation_points[st.session_state.current_question]
         
-        # 質問生成
+        # 質問生成（面接計画・質問バンクに使える質問があればそれを使い、無ければその場で生成）
         if f"question_{st.session_state.current_question}" not in st.session_state:
             with st.spinner("質問を生成中..."):
-                output = generate_question(
-                    st.session_state.llm,
-                    get_rules(st.session_state.profile),
-                    selected_q["content"],
-                    evaluation_points,
-                    get_history_text(st.session_state.chat_history)
-                )
+                output = get_planned_question(st.session_state.current_question)
+                opener_source = "plan"
+                question_bank = get_question_bank()
+                if output is None and question_bank is not None:
+                    opener_source = "bank"
+                    output = question_bank.lookup(st.session_state.profile, selected_q["title"])
+                    if output is not None and question_bank.config["personalize"]:
+                        output = personalize_question(
+                            st.session_state.llm,
+                            output,
+                            get_history_text(st.session_state.chat_history)
+                        )
+                
+                if output is None:
+                    opener_source = "live"
+                    output = generate_question(
+                        st.session_state.llm,
+                        get_rules(st.session_state.profile),
+                        selected_q["content"],
+                        evaluation_points,
+                        get_history_text(st.session_state.chat_history)
+                    )
+                set_span_attributes(opener_source=opener_source)
                 st.session_state[f"question_{st.session_state.current_question}"] = output
+                if opener_source != "plan" and st.session_state.current_question > 0:
+                    cancel_pending_interview_plan()
         
-        current_question = st.session_state[f"question_{st.session_state.current_question}"]
-        # 質問文をクリーニング
-        cleaned_question = clean_question_text(current_question)
+        # generate_question は質問文のみを返すため、そのまま表示・履歴に使用する
+        cleaned_question = st.session_state[f"question_{st.session_state.current_question}"]
         
         st.info("👨‍💼 面接官からの質問")
         st.write(add_newlines_by_period(cleaned_question))
@@ -502,27 +583,47 @@ def show_question_stage():
                 
                 # 深掘り質問の判定（最低1回は必須、最大3回まで）
                 if st.session_state.depth_count < 3:
+                    followup_output = None
+                    
                     # 最初の1回は必ず深掘り、2回目以降はAIが判定
                     if st.session_state.depth_count == 0:
                         should_followup = True
                     else:
-                        with st.spinner("回答を評価中..."):
-                            judge_result = judge_need_followup(st.session_state.llm, get_history_text(st.session_state.chat_history))
-                            should_followup = (judge_result == "Yes")
+                        # 明らかに浅い/十分な回答はローカルで判定し、判断が難しい場合のみAIに委ねる
+                        judge_result = decide_followup_locally(
+                            user_answer,
+                            selected_q["point_keys"],
+                            evaluation_points_list,
+                            get_scorer_config()
+                        )
+                        if judge_result is None:
+                            with st.spinner("回答を評価中..."):
+                                if get_question_output_config()["combined_followup"]:
+                                    # 判定と深掘り質問の生成を1回の呼び出しで行う
+                                    judge_result, followup_output = judge_and_generate_followup(
+                                        st.session_state.llm,
+                                        get_rules(st.session_state.profile),
+                                        evaluation_points,
+                                        get_history_text(st.session_state.chat_history)
+                                    )
+                                else:
+                                    judge_result = judge_need_followup(st.session_state.llm, get_history_text(st.session_state.chat_history))
+                        should_followup = (judge_result == "Yes")
                     
                     if should_followup:
                         st.session_state.depth_count += 1
                         
-                        # 深掘り質問生成
-                        with st.spinner("深掘り質問を生成中..."):
-                            followup_output = generate_question(
-                                st.session_state.llm,
-                                get_rules(st.session_state.profile),
-                                "上記に対する深掘り質問を1つ出力してください。",
-                                evaluation_points,
-                                get_history_text(st.session_state.chat_history)
-                            )
-                            st.session_state[f"question_{st.session_state.current_question}"] = followup_output
+                        # 深掘り質問生成（判定と同時に生成済みの場合は省略）
+                        if followup_output is None:
+                            with st.spinner("深掘り質問を生成中..."):
+                                followup_output = generate_question(
+                                    st.session_state.llm,
+                                    get_rules(st.session_state.profile),
+                                    FOLLOWUP_QUESTION_CONTENT,
+                                    evaluation_points,
+                                    get_history_text(st.session_state.chat_history)
+                                )
+                        st.session_state[f"question_{st.session_state.current_question}"] = followup_output
                         
                         st.rerun()
                     else:
@@ -587,12 +688,12 @@ def show_question_stage():
                 st.rerun()
 
 # フィードバック表示ステージを表示する関数
+@traced()
 def show_feedback_stage():
     st.header("面接フィードバック")
     
-    # プロンプトデータを取得
-    prompts = get_prompts_from_secrets()
-    evaluation_points_list = prompts["evaluation_points_list"]
+    # 評価ポイント一覧はプロンプト一式のバージョンごとに事前レンダリング済みのものを使う
+    evaluation_points_list = get_rendered_prompts().feedback_evaluation_points
     
     # 中断フラグをチェック
     is_interrupted = st.session_state.get("is_interrupted", False)
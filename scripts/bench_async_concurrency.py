@@ -0,0 +1,203 @@
+"""
+同期APIと非同期APIの同時面接数ごとのベンチマーク
+スタブサーバー（別プロセス）に対して、面接1件分の呼び出し（各カテゴリの質問生成と深掘り判定、最後にフィードバック）を
+指定件数だけ同時に実行し、スレッド数・メモリ増加量・スループットを比較する。
+同期API（generate_question など）は面接ごとに1スレッド、非同期API（agenerate_question など）は
+スレッドを使わず共有イベントループ上のコルーチンとして実行する。計測は条件ごとに別プロセスで行う。
+計測前に1回呼び出してクライアントを初期化する（初回の同時呼び出しで OpenAI SDK が作るワーカースレッドを計測に含めない）。
+結果には同時実行数の上限（concurrency_limits）、待ち時間のみから求めた理論上のスループット、
+1呼び出しあたりのCPU時間とそこから求めたCPU上限（1コアで処理できる呼び出し数/秒）を併記する。
+calls/s がCPU上限に近い場合は、スレッドやセマフォではなくクライアント側の処理コスト（とスタブサーバーとのCPUの取り合い）が上限になっている。
+
+使い方:
+    python scripts/bench_async_concurrency.py --interviews 50 200 500 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(SCRIPTS_DIR))
+
+RULES = "あなたは転職面接の面接官です。"
+EVALUATION_POINTS = "- 論理性：結論から簡潔に話せているか"
+EVALUATION_POINTS_LIST = {"論理性": "結論から簡潔に話せているか"}
+ANSWER = "顧客ごとの課題を整理し、提案内容を見直すことで継続率を高めました。"
+
+
+# プロセスのメモリ使用量（RSS、MB）を返す関数
+def _rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+# 実行中のスレッド数とメモリ使用量の最大値を記録するサンプラー
+class _ResourceSampler:
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak_threads = 0
+        self.peak_rss = 0.0
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._done.is_set():
+            self.peak_threads = max(self.peak_threads, threading.active_count())
+            self.peak_rss = max(self.peak_rss, _rss_mb())
+            self._done.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._done.set()
+        self._thread.join()
+
+
+# 同期APIで面接1件分の呼び出しを行う関数
+def interview_sync(llm, categories, think_seconds):
+    from interview_logic import generate_question, judge_need_followup, generate_feedback
+    history = ""
+    for _ in range(categories):
+        question = generate_question(llm, RULES, "転職理由を教えてください。", EVALUATION_POINTS, history)
+        time.sleep(think_seconds)
+        history += f"面接官：{question}\nあなた：{ANSWER}\n"
+        judge_need_followup(llm, history)
+    generate_feedback(llm, EVALUATION_POINTS_LIST, history)
+    return categories * 2 + 1
+
+# 非同期APIで面接1件分の呼び出しを行うコルーチン
+async def interview_async(llm, categories, think_seconds):
+    from interview_logic import agenerate_question, ajudge_need_followup, agenerate_feedback
+    history = ""
+    for _ in range(categories):
+        question = await agenerate_question(llm, RULES, "転職理由を教えてください。", EVALUATION_POINTS, history)
+        await asyncio.sleep(think_seconds)
+        history += f"面接官：{question}\nあなた：{ANSWER}\n"
+        await ajudge_need_followup(llm, history)
+    await agenerate_feedback(llm, EVALUATION_POINTS_LIST, history)
+    return categories * 2 + 1
+
+# 1条件分を計測して結果を返す関数（子プロセスで実行）
+def run_condition(mode, interviews, base_url, categories, think_seconds, feedback_limit):
+    from interview_logic import judge_need_followup
+    from llm_backends import DEFAULT_BACKEND_CONFIG, LLMRouter
+    from llm_runtime import configure_runtime, get_event_loop, get_runtime_config
+
+    config = dict(DEFAULT_BACKEND_CONFIG)
+    config["backends"] = {"fake": {"base_url": base_url, "model": "fake", "api_key": "dummy"}}
+    config["routes"] = {"default": ["fake"]}
+    config["max_retries"] = 0
+    llm = LLMRouter("sk-dummy", config)
+    limits = {"feedback": feedback_limit} if feedback_limit else {}
+    configure_runtime(hedge_call_types=[], concurrency_limits=limits)
+    get_event_loop()
+    judge_need_followup(llm, f"面接官：転職理由を教えてください。\nあなた：{ANSWER}")
+
+    baseline_threads = threading.active_count()
+    baseline_rss = _rss_mb()
+    errors = 0
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    with _ResourceSampler() as sampler:
+        if mode == "sync":
+            def run_one(_):
+                try:
+                    return interview_sync(llm, categories, think_seconds)
+                except Exception:
+                    return None
+            with ThreadPoolExecutor(max_workers=interviews) as executor:
+                results = list(executor.map(run_one, range(interviews)))
+        else:
+            async def run_all():
+                return await asyncio.gather(
+                    *[interview_async(llm, categories, think_seconds) for _ in range(interviews)],
+                    return_exceptions=True
+                )
+            results = asyncio.run_coroutine_threadsafe(run_all(), get_event_loop()).result()
+            results = [r if isinstance(r, int) else None for r in results]
+    elapsed = time.perf_counter() - start
+    cpu_seconds = time.process_time() - cpu_start
+
+    errors = sum(1 for r in results if r is None)
+    calls = sum(r for r in results if r is not None)
+    return {
+        "mode": mode,
+        "interviews": interviews,
+        "elapsed": elapsed,
+        "calls_per_second": calls / elapsed if elapsed else 0.0,
+        "cpu_ms_per_call": cpu_seconds * 1000 / calls if calls else 0.0,
+        "concurrency_limits": get_runtime_config()["concurrency_limits"],
+        "failed_interviews": errors,
+        "peak_threads": sampler.peak_threads,
+        "extra_threads": sampler.peak_threads - baseline_threads,
+        "rss_growth_mb": sampler.peak_rss - baseline_rss,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="同期APIと非同期APIの同時面接数ごとのベンチマーク")
+    parser.add_argument("--interviews", type=int, nargs="+", default=[50, 200, 500], help="同時に実行する面接数")
+    parser.add_argument("--latency", type=float, default=0.5, help="スタブサーバーの応答時間の中央値（秒）")
+    parser.add_argument("--categories", type=int, default=3, help="面接1件あたりのカテゴリ数")
+    parser.add_argument("--think-seconds", type=float, default=0.5, help="ユーザーが1回答に使う時間（秒）")
+    parser.add_argument("--feedback-limit", type=int, default=0, help="フィードバック生成の同時実行数の上限（0は無制限）")
+    parser.add_argument("--port", type=int, default=8765, help="スタブサーバーのポート")
+    parser.add_argument("--run", choices=["sync", "async"], help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        result = run_condition(
+            args.run, args.interviews[0], args.base_url, args.categories, args.think_seconds, args.feedback_limit
+        )
+        print(json.dumps(result))
+        return
+
+    # スタブサーバーのスレッドが計測に混ざらないよう別プロセスで起動
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(SCRIPTS_DIR, "fake_openai_server.py"),
+         "--port", str(args.port), "--latency", str(args.latency), "--seed", "7"],
+        stdout=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{args.port}/v1"
+    time.sleep(1.0)
+    try:
+        # 1件の面接の所要時間（待ち時間のみ）から求めた、処理コストが無い場合のスループット
+        interview_seconds = args.categories * (2 * args.latency + args.think_seconds) + args.latency
+        calls_per_interview = args.categories * 2 + 1
+        print(f"CPU コア数: {os.cpu_count()}（スタブサーバーも同じマシンで動作）")
+        print(f"{'mode':<6} {'同時面接':>8} {'経過':>8} {'calls/s':>8} {'理論値':>8} {'CPU/call':>9} {'CPU上限':>8} {'失敗':>4} "
+              f"{'最大スレッド':>10} {'増加スレッド':>10} {'RSS増加':>9}  同時実行数の上限")
+        for interviews in args.interviews:
+            for mode in ("sync", "async"):
+                output = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--run", mode, "--base-url", base_url,
+                     "--interviews", str(interviews), "--categories", str(args.categories),
+                     "--think-seconds", str(args.think_seconds), "--feedback-limit", str(args.feedback_limit)],
+                    capture_output=True, text=True, check=True
+                ).stdout
+                r = json.loads(output.strip().splitlines()[-1])
+                ideal = interviews * calls_per_interview / interview_seconds
+                cpu_bound = 1000 / r["cpu_ms_per_call"] if r["cpu_ms_per_call"] else 0.0
+                print(
+                    f"{r['mode']:<6} {r['interviews']:>8} {r['elapsed']:>7.2f}s {r['calls_per_second']:>8.1f} {ideal:>8.1f} "
+                    f"{r['cpu_ms_per_call']:>7.1f}ms {cpu_bound:>8.1f} {r['failed_interviews']:>4} {r['peak_threads']:>10} "
+                    f"{r['extra_threads']:>10} {r['rss_growth_mb']:>7.1f}MB  {r['concurrency_limits'] or '無制限'}"
+                )
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    main()
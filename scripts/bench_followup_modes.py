@@ -0,0 +1,109 @@
+"""
+深掘り判定の1回呼び出しモードと従来の2回呼び出しの比較ベンチマーク
+ローカルのスタブサーバー（または secrets.toml で設定したバックエンド）に対して、
+回答1件あたりのレイテンシと入力トークン数（プロンプトトークン）を比較する
+
+使い方:
+    python scripts/bench_followup_modes.py --answers 100 --latency 0.5
+    python scripts/bench_followup_modes.py --answers 20 --use-configured-backend --api-key sk-...
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_openai_server import FakeBackendProfile, start_fake_server
+from interview_logic import (
+    setup_llm, get_rules, get_history_text, generate_question, judge_need_followup,
+    judge_and_generate_followup, FOLLOWUP_QUESTION_CONTENT
+)
+from llm_backends import DEFAULT_BACKEND_CONFIG, LLMRouter
+from llm_metrics import get_recent_calls, percentile, reset_metrics
+from llm_runtime import configure_runtime
+from secrets_config import get_prompts_from_secrets
+
+PROFILE = {
+    "age": "32", "current_gyokai": "IT", "current_job": "エンジニア", "role": "リーダー",
+    "experience_years": "6年", "target_gyokai": "コンサルティング", "target_job": "ITコンサルタント",
+}
+
+CHAT_HISTORY = [
+    {"role": "assistant", "content": "それでは、最初にあなたの自己紹介を1分（400字程度）でお願いします。"},
+    {"role": "user", "content": "SIerで6年間、金融機関向けシステムの開発に携わり、直近2年は5名のチームリーダーを務めています。"},
+    {"role": "assistant", "content": "現職で最も力を入れて取り組んだ課題について教えてください。"},
+    {"role": "user", "content": "リリース後の障害が多かったため、レビュー手順を見直しました。"},
+    {"role": "assistant", "content": "レビュー手順の見直しでは、具体的に何を変えたのですか？"},
+    {"role": "user", "content": "チェックリストを作り、テスト観点を事前に合意するようにしました。"},
+]
+
+
+# 従来の2回呼び出し（判定→必要なら質問生成）を1件分実行する関数
+def run_two_call(llm, rules, evaluation_points, history):
+    if judge_need_followup(llm, history) == "Yes":
+        generate_question(llm, rules, FOLLOWUP_QUESTION_CONTENT, evaluation_points, history)
+
+# 1回呼び出しモードを1件分実行する関数
+def run_combined(llm, rules, evaluation_points, history):
+    judge_and_generate_followup(llm, rules, evaluation_points, history)
+
+# 指定モードを繰り返し実行し、回答1件あたりのレイテンシ・トークン数を集計する関数
+def measure(label, runner, llm, rules, evaluation_points, history, answers):
+    reset_metrics()
+    latencies = []
+    for _ in range(answers):
+        start = time.perf_counter()
+        runner(llm, rules, evaluation_points, history)
+        latencies.append(time.perf_counter() - start)
+
+    records = get_recent_calls()
+    prompt_tokens = sum(r["prompt_tokens"] or 0 for r in records)
+    completion_tokens = sum(r["completion_tokens"] or 0 for r in records)
+    print(
+        f"{label:<9} p50={percentile(latencies, 50):.3f}s p95={percentile(latencies, 95):.3f}s "
+        f"calls/answer={len(records) / answers:.2f} "
+        f"prompt_tokens/answer={prompt_tokens / answers:.0f} "
+        f"completion_tokens/answer={completion_tokens / answers:.0f}"
+    )
+    return percentile(latencies, 50), prompt_tokens / answers
+
+def main():
+    parser = argparse.ArgumentParser(description="深掘り判定の1回呼び出しモードの比較")
+    parser.add_argument("--answers", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.5, help="スタブサーバーの応答時間の中央値（秒）")
+    parser.add_argument("--use-configured-backend", action="store_true", help="secrets.toml のバックエンドを使う")
+    parser.add_argument("--api-key", default=os.environ.get("OPENAI_API_KEY", "sk-dummy"))
+    args = parser.parse_args()
+
+    if args.use_configured_backend:
+        llm = setup_llm(args.api_key)
+    else:
+        _, base_url = start_fake_server(profile=FakeBackendProfile(latency=args.latency, seed=11))
+        config = dict(DEFAULT_BACKEND_CONFIG)
+        config["backends"] = {"fake": {"base_url": base_url, "model": "fake", "api_key": "dummy"}}
+        config["routes"] = {"default": ["fake"]}
+        llm = LLMRouter(args.api_key, config)
+    # 比較を単純にするためヘッジは無効化
+    configure_runtime(hedge_call_types=[])
+
+    prompts = get_prompts_from_secrets()
+    question = prompts["questions_list"][0]
+    evaluation_points = "\n".join(
+        [f"- {k}：{prompts['evaluation_points_list'][k]}" for k in question["point_keys"]]
+    )
+    rules = get_rules(PROFILE)
+    history = get_history_text(CHAT_HISTORY)
+
+    two_call_p50, two_call_tokens = measure("two-call", run_two_call, llm, rules, evaluation_points, history, args.answers)
+    combined_p50, combined_tokens = measure("combined", run_combined, llm, rules, evaluation_points, history, args.answers)
+    # 増減は combined - two-call（負の値が改善・削減）
+    print(
+        f"p50 の増減: {combined_p50 - two_call_p50:+.3f}s  "
+        f"入力トークンの増減: {combined_tokens - two_call_tokens:+.0f}/回答"
+        f"（{'削減' if combined_tokens < two_call_tokens else '増加'}）"
+    )
+
+if __name__ == "__main__":
+    main()
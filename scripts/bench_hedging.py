@@ -0,0 +1,113 @@
+"""
+ヘッジリクエストと中断のベンチマーク
+ローカルのスタブサーバー（まれに長時間停止する設定）に対して深掘り判定を繰り返し、
+ヘッジ無効時と有効時のレイテンシ（p50/p95/p99）、ヘッジ率、中断までの時間を比較する
+
+使い方:
+    python scripts/bench_hedging.py --calls 300 --stall-rate 0.05 --stall-seconds 3
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_openai_server import FakeBackendProfile, start_fake_server
+from interview_logic import judge_need_followup
+from llm_backends import DEFAULT_BACKEND_CONFIG, LLMRouter
+from llm_metrics import percentile, reset_metrics
+from llm_runtime import (
+    CancelToken, LLMCallCancelled, configure_runtime, get_hedge_stats, llm_call_scope, reset_hedge_stats
+)
+
+HISTORY = "面接官：転職理由を教えてください。\nあなた：より大きな裁量を持って働きたいからです。"
+
+
+# 指定した設定で深掘り判定を繰り返し、各呼び出しのレイテンシを返す関数
+def run_calls(router, calls, concurrency):
+    def timed_call(_):
+        start = time.perf_counter()
+        judge_need_followup(router, HISTORY)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(timed_call, range(calls)))
+
+# 実行中の呼び出しを CancelToken で中断し、呼び出し元に戻るまでの時間を測る関数
+def measure_cancellation(router, cancel_after):
+    token = CancelToken()
+    result = {}
+
+    def worker():
+        start = time.perf_counter()
+        with llm_call_scope(token):
+            try:
+                judge_need_followup(router, HISTORY)
+                result["status"] = "completed"
+            except LLMCallCancelled:
+                result["status"] = "cancelled"
+        result["elapsed"] = time.perf_counter() - start
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    time.sleep(cancel_after)
+    token.cancel()
+    thread.join()
+    return result
+
+def _print_row(label, latencies, stats):
+    print(
+        f"{label:<8} p50={percentile(latencies, 50):.3f}s p95={percentile(latencies, 95):.3f}s "
+        f"p99={percentile(latencies, 99):.3f}s hedge_rate={stats['hedge_rate']:.1%} "
+        f"hedge_wins={stats['hedge_wins']}"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="ヘッジリクエストと中断のベンチマーク")
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--stall-rate", type=float, default=0.05)
+    parser.add_argument("--stall-seconds", type=float, default=3.0)
+    parser.add_argument("--max-ratio", type=float, default=0.1, help="追加リクエストの割合の上限")
+    args = parser.parse_args()
+
+    server, base_url = start_fake_server(profile=FakeBackendProfile(
+        latency=args.latency, error_rate=0.0, stall_rate=args.stall_rate,
+        stall_seconds=args.stall_seconds, seed=7
+    ))
+    config = dict(DEFAULT_BACKEND_CONFIG)
+    config["backends"] = {"fake": {"base_url": base_url, "model": "fake", "api_key": "dummy", "max_retries": 0}}
+    config["routes"] = {"default": ["fake"]}
+    router = LLMRouter("sk-dummy", config)
+
+    configure_runtime(hedge_call_types=[], hedge_min_samples=20, hedge_min_delay=0.0)
+    baseline = run_calls(router, args.calls, args.concurrency)
+    _print_row("baseline", baseline, get_hedge_stats())
+
+    # ベースラインの計測値をp90の算出に使い、ヘッジを有効化して再計測
+    reset_hedge_stats()
+    configure_runtime(hedge_call_types=["judge"], hedge_max_ratio=args.max_ratio)
+    requests_before = server.profile.request_count
+    hedged = run_calls(router, args.calls, args.concurrency)
+    _print_row("hedged", hedged, get_hedge_stats())
+    extra = server.profile.request_count - requests_before - args.calls
+    print(f"追加リクエスト: {extra} 件（上限 {args.max_ratio:.0%}）")
+    print(f"p95 改善: {percentile(baseline, 95) - percentile(hedged, 95):+.3f}s")
+    print(f"p99 改善: {percentile(baseline, 99) - percentile(hedged, 99):+.3f}s")
+
+    # 長時間停止するリクエストを途中で中断
+    reset_metrics()
+    configure_runtime(hedge_call_types=[])
+    server.profile.stall_rate = 1.0
+    result = measure_cancellation(router, cancel_after=0.5)
+    print(f"中断: status={result['status']} 呼び出し元に戻るまで {result['elapsed']:.2f}s"
+          f"（停止時間 {args.stall_seconds + args.latency:.1f}s）")
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
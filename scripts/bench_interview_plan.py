@@ -0,0 +1,115 @@
+"""
+面接計画（初回質問の一括生成）のベンチマーク
+自己紹介→各カテゴリの初回質問→深掘り1回、という面接を模擬し、カテゴリ切り替え時に
+ユーザーが待つ時間と面接全体のトークン数を、従来（都度生成）と面接計画ありで比較する
+
+使い方:
+    python scripts/bench_interview_plan.py --latency 1.5 --think-seconds 5
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_openai_server import FakeBackendProfile, start_fake_server
+from interview_logic import (
+    get_rules, get_history_text, generate_question, agenerate_opening_questions, get_plan_wait_seconds,
+    FOLLOWUP_QUESTION_CONTENT
+)
+from llm_backends import DEFAULT_BACKEND_CONFIG, LLMRouter
+from llm_metrics import get_recent_calls, reset_metrics
+from llm_runtime import configure_runtime, submit_coroutine, wait_background
+from secrets_config import get_prompts_from_secrets
+
+PROFILE = {
+    "age": "29", "current_gyokai": "メーカー", "current_job": "営業", "role": "メンバー",
+    "experience_years": "5年", "target_gyokai": "IT", "target_job": "カスタマーサクセス",
+}
+INTRO = "メーカーで5年間法人営業を担当し、既存顧客の深耕で前年比120%の売上を達成しました。"
+ANSWER = "顧客ごとの課題を整理し、提案内容を見直すことで継続率を高めました。"
+
+
+# 1回分の面接を模擬し、カテゴリ切り替え時の待ち時間を返す関数
+def simulate_interview(llm, prompts, use_plan, think_seconds):
+    questions_list = prompts["questions_list"]
+    evaluation_points_list = prompts["evaluation_points_list"]
+    rules = get_rules(PROFILE)
+    chat_history = [
+        {"role": "assistant", "content": "それでは、最初にあなたの自己紹介を1分（400字程度）でお願いします。"},
+        {"role": "user", "content": INTRO},
+    ]
+
+    plan = None
+    if use_plan and len(questions_list) > 1:
+        history = get_history_text(chat_history)
+        plan = submit_coroutine(
+            lambda: agenerate_opening_questions(llm, rules, questions_list[1:], evaluation_points_list, history)
+        )
+
+    waits = []
+    for index, question in enumerate(questions_list):
+        evaluation_points = "\n".join([f"- {k}：{evaluation_points_list[k]}" for k in question["point_keys"]])
+
+        # カテゴリ切り替え時にユーザーが待つ時間
+        start = time.perf_counter()
+        opener = None
+        if plan is not None and index > 0:
+            try:
+                opener = wait_background(plan, get_plan_wait_seconds())[index - 1]
+            except FutureTimeoutError:
+                opener = None
+        if opener is None:
+            opener = generate_question(llm, rules, question["content"], evaluation_points, get_history_text(chat_history))
+            # rollplay.py と同じく、間に合わなかった計画は打ち切る
+            if plan is not None and index > 0 and not plan.done():
+                plan.cancel()
+                plan = None
+        waits.append(time.perf_counter() - start)
+
+        # 初回質問への回答と深掘り1回
+        time.sleep(think_seconds)
+        chat_history += [{"role": "assistant", "content": opener}, {"role": "user", "content": ANSWER}]
+        followup = generate_question(llm, rules, FOLLOWUP_QUESTION_CONTENT, evaluation_points, get_history_text(chat_history))
+        time.sleep(think_seconds)
+        chat_history += [{"role": "assistant", "content": followup}, {"role": "user", "content": ANSWER}]
+    return waits
+
+# 記録済みの呼び出しからトークン数の合計を返す関数
+def _total_tokens():
+    records = get_recent_calls()
+    return (
+        sum(r["prompt_tokens"] or 0 for r in records),
+        sum(r["completion_tokens"] or 0 for r in records),
+        len(records),
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="面接計画（初回質問の一括生成）のベンチマーク")
+    parser.add_argument("--latency", type=float, default=1.0, help="スタブサーバーの応答時間の中央値（秒）")
+    parser.add_argument("--think-seconds", type=float, default=2.0, help="ユーザーが1回答に使う時間（秒）")
+    args = parser.parse_args()
+
+    _, base_url = start_fake_server(profile=FakeBackendProfile(latency=args.latency, seed=5))
+    config = dict(DEFAULT_BACKEND_CONFIG)
+    config["backends"] = {"fake": {"base_url": base_url, "model": "fake", "api_key": "dummy"}}
+    config["routes"] = {"default": ["fake"]}
+    llm = LLMRouter("sk-dummy", config)
+    configure_runtime(hedge_call_types=[])
+    prompts = get_prompts_from_secrets()
+
+    for label, use_plan in (("live", False), ("plan", True)):
+        reset_metrics()
+        waits = simulate_interview(llm, prompts, use_plan, args.think_seconds)
+        prompt_tokens, completion_tokens, calls = _total_tokens()
+        wait_text = " ".join(f"{w:.2f}s" for w in waits)
+        print(
+            f"{label:<5} 切り替え待ち=[{wait_text}] 合計={sum(waits):.2f}s "
+            f"calls={calls} prompt_tokens={prompt_tokens} completion_tokens={completion_tokens}"
+        )
+
+if __name__ == "__main__":
+    main()
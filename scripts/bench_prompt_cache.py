@@ -0,0 +1,112 @@
+"""
+プロンプト部品の事前レンダリングキャッシュのベンチマーク
+質問生成・フィードバック生成のリクエスト組み立て（評価ポイント・ルール・テンプレート）を、
+毎回組み立てる従来の方法とプロンプトキャッシュを使う方法で繰り返し、1回あたりの時間を比較する。
+あわせて各部品のトークン数を、キャッシュが保持する概算値と tiktoken による実測値（使えない環境では省略）で表示する。
+tiktoken はベンチマーク専用の任意の依存（pip install tiktoken）。
+
+使い方:
+    python scripts/bench_prompt_cache.py --sessions 1000 --reruns 20
+"""
+
+import argparse
+import os
+import sys
+import time
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.prompts import ChatPromptTemplate
+from interview_logic import QUESTION_JSON_INSTRUCTION
+from prompt_cache import estimate_tokens, get_rendered_prompts
+from secrets_config import get_prompts_from_secrets
+
+PROFILES = [
+    {
+        "age": str(25 + i % 20), "current_gyokai": "メーカー", "current_job": "営業", "role": "メンバー",
+        "experience_years": f"{i % 15}年", "target_gyokai": "IT", "target_job": "カスタマーサクセス",
+    }
+    for i in range(50)
+]
+# トークン数の計測に使うエンコーディング
+ENCODING = "o200k_base"
+
+
+# 従来の方法（毎回文字列とテンプレートを組み立てる）で1回分のリクエストを組み立てる関数
+def build_uncached(prompts, profile, category_index):
+    selected_q = prompts["questions_list"][category_index]
+    evaluation_points_list = prompts["evaluation_points_list"]
+    evaluation_points = "\n".join([f"- {k}：{evaluation_points_list[k]}" for k in selected_q["point_keys"]])
+    rules = prompts["RULES_TEMPLATE"].format(**profile)
+    question_prompt = ChatPromptTemplate.from_template(prompts["QUESTION_TEMPLATE"] + QUESTION_JSON_INSTRUCTION)
+    feedback_points = str(evaluation_points_list)
+    return evaluation_points, rules, question_prompt, feedback_points
+
+# プロンプトキャッシュを使って1回分のリクエストを組み立てる関数
+def build_cached(prompts, profile, category_index):
+    rendered = get_rendered_prompts(prompts)
+    evaluation_points = rendered.category_evaluation_points[category_index]
+    rules = rendered.get_rules(profile)
+    question_prompt = rendered.get_template("QUESTION_TEMPLATE", QUESTION_JSON_INSTRUCTION)
+    feedback_points = rendered.feedback_evaluation_points
+    return evaluation_points, rules, question_prompt, feedback_points
+
+# tiktoken でトークン数を数える関数を返す関数（使えない環境では None）
+def make_token_counter():
+    if tiktoken is None:
+        return None
+    try:
+        encoding = tiktoken.get_encoding(ENCODING)
+    except Exception:
+        # エンコーディングをダウンロードできない環境では実測を省略する
+        return None
+    return lambda text: len(encoding.encode(text))
+
+def _measure(build, sessions, reruns):
+    categories = len(get_prompts_from_secrets()["questions_list"])
+    elapsed = 0.0
+    for session in range(sessions):
+        profile = PROFILES[session % len(PROFILES)]
+        for rerun in range(reruns):
+            # 再実行ごとに get_prompts_from_secrets から取り直す実際の流れに合わせる
+            prompts = get_prompts_from_secrets()
+            start = time.perf_counter()
+            build(prompts, profile, rerun % categories)
+            elapsed += time.perf_counter() - start
+    return elapsed / (sessions * reruns)
+
+def main():
+    parser = argparse.ArgumentParser(description="プロンプト部品の事前レンダリングキャッシュのベンチマーク")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--reruns", type=int, default=20, help="1セッションあたりの再実行回数")
+    args = parser.parse_args()
+
+    uncached = _measure(build_uncached, args.sessions, args.reruns)
+    cached = _measure(build_cached, args.sessions, args.reruns)
+    print(f"従来     : {uncached * 1e6:8.1f} µs / リクエスト")
+    print(f"キャッシュ: {cached * 1e6:8.1f} µs / リクエスト（{uncached / cached:.1f}倍）")
+
+    rendered = get_rendered_prompts()
+    counts = rendered.token_counts
+    count_tokens = make_token_counter()
+
+    def measured(text):
+        return f"（tiktoken: {count_tokens(text)}）" if count_tokens else ""
+
+    print(f"プロンプトのバージョン: {rendered.version}（トークン数は概算）")
+    for q, text, tokens in zip(
+        rendered.prompts["questions_list"], rendered.category_evaluation_points, counts["category_evaluation_points"]
+    ):
+        print(f"  評価ポイント[{q['title']}]: {tokens} tokens{measured(text)}")
+    legacy = str(rendered.prompts["evaluation_points_list"])
+    print(f"  フィードバック用評価ポイント: {counts['feedback_evaluation_points']} tokens"
+          f"{measured(rendered.feedback_evaluation_points)} "
+          f"（従来の辞書表記: {estimate_tokens(legacy)} tokens{measured(legacy)}）")
+
+if __name__ == "__main__":
+    main()
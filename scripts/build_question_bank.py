@@ -0,0 +1,101 @@
+"""
+初回質問バンクの事前生成ジョブ
+よくある志望業界・職種・役割・経験年数の組み合わせについて、questions_list の各カテゴリの
+初回質問を generate_question で事前に生成し、question_bank.py が読み込むインデックスに保存する
+
+入力（JSON）:
+    {
+      "profiles": [
+        {"target_gyokai": "IT", "target_job": "エンジニア", "role": "メンバー", "experience_years": "3年"},
+        ...
+      ]
+    }
+profiles は一般的なものから順に並べる（容量超過時は後ろのものから破棄される）。
+年齢・現在の業界・現在の職種はバンクのキーに含まれないため、ルールプロンプトには
+特定の値ではなく「自己紹介を参照」とする中立な表現を入れて生成する（"defaults" で上書き可能）。
+
+使い方:
+    python scripts/build_question_bank.py profiles.json --api-key sk-... --variants 3
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from interview_logic import setup_llm, generate_question, get_rules, get_history_text
+from prompt_cache import render_evaluation_points
+from question_bank import DEFAULT_QUESTION_BANK_CONFIG, QuestionBank
+from secrets_config import get_prompts_from_secrets
+
+# 事前生成時の会話履歴（自己紹介を依頼した時点までを想定）
+INTRO_HISTORY = [{
+    "role": "assistant",
+    "content": "それでは、最初にあなたの自己紹介を1分（400字程度）でお願いします。"
+}]
+
+# バンクのキーに含まれないプロフィール項目（利用者ごとに異なるため特定の値を仮定しない）
+NEUTRAL_PROFILE = {
+    "age": "不明（自己紹介を参照）",
+    "current_gyokai": "不明（自己紹介を参照）",
+    "current_job": "不明（自己紹介を参照）",
+}
+
+
+# 1つのプロフィール・カテゴリについて初回質問の候補を生成する関数
+def generate_entry(llm, profile, question, evaluation_points_list, variants):
+    # その場で生成する場合と同じ評価ポイントの文字列で生成する
+    evaluation_points = render_evaluation_points(question["point_keys"], evaluation_points_list)
+    questions = []
+    for _ in range(variants):
+        questions.append(generate_question(
+            llm,
+            get_rules(profile),
+            question["content"],
+            evaluation_points,
+            get_history_text(INTRO_HISTORY)
+        ))
+    entry = {key: profile[key] for key in ("target_gyokai", "target_job", "role", "experience_years")}
+    entry.update({"category": question["title"], "questions": questions})
+    return entry
+
+def main():
+    parser = argparse.ArgumentParser(description="初回質問バンクの事前生成")
+    parser.add_argument("spec", help="生成対象のプロフィールを記載したJSONファイル")
+    parser.add_argument("--output", default=DEFAULT_QUESTION_BANK_CONFIG["index_path"])
+    parser.add_argument("--api-key", default=os.environ.get("OPENAI_API_KEY", ""))
+    parser.add_argument("--variants", type=int, default=2, help="1つの組み合わせあたりの候補数")
+    parser.add_argument("--workers", type=int, default=4, help="並列に生成する数")
+    args = parser.parse_args()
+
+    with open(args.spec, encoding="utf-8") as f:
+        spec = json.load(f)
+
+    prompts = get_prompts_from_secrets()
+    llm = setup_llm(args.api_key)
+    defaults = dict(NEUTRAL_PROFILE, **spec.get("defaults", {}))
+    jobs = [
+        (dict(defaults, **profile), question)
+        for profile in spec["profiles"]
+        for question in prompts["questions_list"]
+    ]
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        entries = list(executor.map(
+            lambda job: generate_entry(llm, job[0], job[1], prompts["evaluation_points_list"], args.variants),
+            jobs
+        ))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "entries": entries}, f, ensure_ascii=False, indent=2)
+
+    # 書き出したインデックスが読み込めることを確認
+    bank = QuestionBank(DEFAULT_QUESTION_BANK_CONFIG)
+    bank.load(args.output)
+    print(f"{len(entries)} 件のエントリを {args.output} に保存しました（読み込み後 {bank.stats()['entries']} 件）")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+ローカル深掘り判定スコアラーの評価スクリプト
+記録済みの面接トランスクリプトに対して、LLMの深掘り判定（judge_need_followup）との一致率と
+LLM判定呼び出しの削減率を計測する
+
+入力はJSONL形式（1行1回答）:
+    {"answer": "回答文", "point_keys": ["課題解決力", ...], "judge": "Yes" | "No",
+     "history": "面接官：...\\nあなた：..."}
+
+"judge" が無いレコードは --api-key を指定した場合のみ、"history" を使って
+その場でLLMに判定させる（指定が無い場合は評価対象外）。
+
+使い方:
+    python scripts/eval_followup_scorer.py transcripts.jsonl
+    python scripts/eval_followup_scorer.py transcripts.jsonl --shallow 0.25 --thorough 0.8
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from answer_scorer import DEFAULT_SCORER_CONFIG, decide_followup_locally, score_answer
+
+
+# JSONLファイルから評価レコードを読み込む関数
+def load_records(path):
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    return records
+
+# 不足しているLLM判定ラベルをその場で取得する関数
+def fill_missing_labels(records, api_key):
+    from interview_logic import setup_llm, judge_need_followup
+    llm = setup_llm(api_key)
+    for record in records:
+        if record.get("judge") not in ("Yes", "No") and record.get("history"):
+            record["judge"] = judge_need_followup(llm, record["history"])
+
+# スコアラーとLLM判定の一致率・呼び出し削減率を集計する関数
+def evaluate(records, evaluation_points_list, config):
+    """
+    Returns:
+        dict: total（評価件数）、decided（ローカル判定件数）、avoided_rate（LLM呼び出し削減率）、
+              agreement（ローカル判定時のLLMとの一致率）、confusion（判定の内訳）
+    """
+    confusion = {"Yes/Yes": 0, "Yes/No": 0, "No/Yes": 0, "No/No": 0}
+    total = 0
+    decided = 0
+    agreed = 0
+    deferred_scores = []
+
+    for record in records:
+        judge = record.get("judge")
+        if judge not in ("Yes", "No"):
+            continue
+        total += 1
+        points = record.get("evaluation_points", evaluation_points_list)
+        local = decide_followup_locally(record["answer"], record.get("point_keys", []), points, config)
+        if local is None:
+            deferred_scores.append(score_answer(record["answer"], record.get("point_keys", []), points, config))
+            continue
+        decided += 1
+        confusion[f"{local}/{judge}"] += 1
+        if local == judge:
+            agreed += 1
+
+    return {
+        "total": total,
+        "decided": decided,
+        "avoided_rate": decided / total if total else 0.0,
+        "agreement": agreed / decided if decided else 0.0,
+        "confusion": confusion,
+        "deferred_score_range": (
+            (min(deferred_scores), max(deferred_scores)) if deferred_scores else None
+        ),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="ローカル深掘り判定スコアラーの評価")
+    parser.add_argument("transcripts", help="評価用JSONLファイル")
+    parser.add_argument("--shallow", type=float, help="shallow_threshold の上書き")
+    parser.add_argument("--thorough", type=float, help="thorough_threshold の上書き")
+    parser.add_argument("--min-chars", type=int, help="min_chars の上書き")
+    parser.add_argument("--api-key", help="judgeラベルが無いレコードをLLMで判定する場合のAPIキー")
+    args = parser.parse_args()
+
+    # 既定では無効になっているため、評価時は有効にして閾値の候補を試す
+    config = dict(DEFAULT_SCORER_CONFIG, enabled=True)
+    if args.shallow is not None:
+        config["shallow_threshold"] = args.shallow
+    if args.thorough is not None:
+        config["thorough_threshold"] = args.thorough
+    if args.min_chars is not None:
+        config["min_chars"] = args.min_chars
+
+    records = load_records(args.transcripts)
+    if args.api_key:
+        fill_missing_labels(records, args.api_key)
+
+    # レコードに評価ポイントが無い場合のみプロンプト設定から読み込む
+    evaluation_points_list = {}
+    if any("evaluation_points" not in r for r in records):
+        from secrets_config import get_prompts_from_secrets
+        evaluation_points_list = get_prompts_from_secrets()["evaluation_points_list"]
+
+    result = evaluate(records, evaluation_points_list, config)
+
+    print(f"評価件数:               {result['total']}")
+    print(f"ローカル判定件数:       {result['decided']}")
+    print(f"LLM判定の削減率:        {result['avoided_rate']:.1%}")
+    print(f"LLM判定との一致率:      {result['agreement']:.1%}")
+    print("内訳（ローカル/LLM）:   " + ", ".join(f"{k}={v}" for k, v in result["confusion"].items()))
+    if result["deferred_score_range"]:
+        low, high = result["deferred_score_range"]
+        print(f"LLMに委ねたスコア範囲:  {low:.2f} - {high:.2f}")
+
+if __name__ == "__main__":
+    main()
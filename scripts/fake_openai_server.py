@@ -0,0 +1,236 @@
+"""
+OpenAI互換の Chat Completions API を模したローカルのスタブサーバー
+実際のAPIを呼ばずに、LLMバックエンドのルーティング・ベンチマーク・負荷試験を行うために使う。
+レイテンシ（対数正規分布）、エラー率、まれな長時間の停止（ストール）を再現できる。
+
+使い方:
+    python scripts/fake_openai_server.py --port 8000 --latency 0.8 --error-rate 0.02
+    # secrets.toml
+    # [llm_backends.backends.fake]
+    # base_url = "http://localhost:8000/v1"
+    # model = "fake-model"
+    # api_key = "dummy"
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# スタブサーバーの応答特性
+class FakeBackendProfile:
+    def __init__(self, latency=0.5, sigma=0.3, error_rate=0.0, stall_rate=0.0, stall_seconds=5.0, seed=None,
+                 reject_response_format=False):
+        """
+        Args:
+            latency (float): 応答時間の中央値（秒）
+            sigma (float): 対数正規分布のばらつき
+            error_rate (float): HTTP 500 を返す確率
+            stall_rate (float): 長時間停止する確率
+            stall_seconds (float): 停止時に追加で待つ秒数
+            seed (int): 乱数シード
+            reject_response_format (bool): response_format 付きのリクエストを HTTP 400 で拒否する
+                                           （JSONモードに対応していないセルフホストのサーバーを再現）
+        """
+        self.latency = latency
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.reject_response_format = reject_response_format
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.request_count = 0
+
+    # 1リクエスト分の待ち時間とエラー有無を決める関数
+    def sample(self):
+        with self._lock:
+            self.request_count += 1
+            delay = self.latency * math.exp(self._random.gauss(0, self.sigma)) if self.latency > 0 else 0.0
+            if self._random.random() < self.stall_rate:
+                delay += self.stall_seconds
+            failed = self._random.random() < self.error_rate
+            answer = self._random.random()
+        return delay, failed, answer
+
+
+# プロンプトの内容に応じてそれらしい応答テキストを作る関数
+def build_reply(body, answer):
+    """
+    Args:
+        body (dict): Chat Completions のリクエストボディ
+        answer (float): 0〜1の乱数（Yes/No などの分岐に使用）
+
+    Returns:
+        str: 応答テキスト
+    """
+    text = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+    wants_json = (body.get("response_format") or {}).get("type") == "json_object"
+
+    if wants_json and '"questions"' in text:
+        count = max(1, len(re.findall(r'【カテゴリ\d+】', text)))
+        return json.dumps({
+            "questions": [f"{i}つ目のテーマについて、これまでのご経験を具体的に教えてください。" for i in range(1, count + 1)]
+        }, ensure_ascii=False)
+    if wants_json and '"need_followup"' in text:
+        need_followup = answer < 0.5
+        return json.dumps({
+            "need_followup": need_followup,
+            "question": "その判断に至った根拠を具体的に教えてください。" if need_followup else "",
+        }, ensure_ascii=False)
+    if wants_json:
+        return json.dumps({"question": "その取り組みで最も苦労した点と、どのように乗り越えたかを教えてください。"}, ensure_ascii=False)
+    if "Yes" in text and "No" in text:
+        return "Yes" if answer < 0.5 else "No"
+    if "合否結果" in text:
+        return (
+            "合否結果：ボーダー\n"
+            "- 評価：\n"
+            "コミュニケーション力：★★★☆☆ 結論から話せています。\n"
+            "総評：具体的な数値を交えるとより説得力が増します。"
+        )
+    return "面接官：ありがとうございます。では、現職で最も成果を上げた取り組みについて教えてください。"
+
+# 文字数からおおよそのトークン数を見積もる関数
+def _estimate_tokens(text):
+    return max(1, len(text) // 2)
+
+
+# Chat Completions リクエストを処理するハンドラを作る関数
+def make_handler(profile):
+    class FakeOpenAIHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": "not found"}})
+                return
+
+            if profile.reject_response_format and body.get("response_format"):
+                self._send_json(400, {"error": {"message": "response_format is not supported", "type": "invalid_request_error"}})
+                return
+
+            delay, failed, answer = profile.sample()
+            time.sleep(delay)
+            if failed:
+                self._send_json(500, {"error": {"message": "fake backend error", "type": "server_error"}})
+                return
+
+            content = build_reply(body, answer)
+            max_tokens = body.get("max_tokens")
+            if max_tokens:
+                content = content[:max_tokens * 2]
+            prompt_text = "".join(str(m.get("content", "")) for m in body.get("messages", []))
+            usage = {
+                "prompt_tokens": _estimate_tokens(prompt_text),
+                "completion_tokens": _estimate_tokens(content),
+            }
+            usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+            if body.get("stream"):
+                self._send_stream(body, content)
+                return
+
+            self._send_json(200, {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "fake-model"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+
+        def _send_json(self, status, payload):
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_stream(self, body, content):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+            for i in range(0, len(content), 8):
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": body.get("model", "fake-model"),
+                    "choices": [{"index": 0, "delta": {"content": content[i:i + 8]}, "finish_reason": None}],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.close_connection = True
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakeOpenAIHandler
+
+
+# 中断されたリクエスト（クライアント側の切断）をエラー出力しないサーバー
+class _FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        pass
+
+
+# スタブサーバーをバックグラウンドスレッドで起動する関数
+def start_fake_server(port=0, profile=None):
+    """
+    Args:
+        port (int): 待ち受けポート（0なら空きポートを自動選択）
+        profile (FakeBackendProfile): 応答特性（省略時は既定値）
+
+    Returns:
+        tuple: (server, base_url) - server.shutdown() で停止できる
+    """
+    profile = profile or FakeBackendProfile()
+    server = _FakeServer(("127.0.0.1", port), make_handler(profile))
+    server.profile = profile
+    threading.Thread(target=server.serve_forever, name="fake-openai", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI互換のスタブサーバー")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.5, help="応答時間の中央値（秒）")
+    parser.add_argument("--sigma", type=float, default=0.3)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--stall-rate", type=float, default=0.0)
+    parser.add_argument("--stall-seconds", type=float, default=5.0)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--reject-response-format", action="store_true", help="response_format 付きのリクエストを拒否する")
+    args = parser.parse_args()
+
+    profile = FakeBackendProfile(
+        args.latency, args.sigma, args.error_rate, args.stall_rate, args.stall_seconds, args.seed,
+        args.reject_response_format
+    )
+    server, base_url = start_fake_server(args.port, profile)
+    print(f"Fake OpenAI server listening on {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
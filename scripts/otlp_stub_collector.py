@@ -0,0 +1,70 @@
+"""
+OTLP/HTTP（JSON）互換のローカル簡易コレクタ
+本番のコレクタ（OpenTelemetry Collector など）の代わりに、受信したスパンをJSONLで保存する
+
+使い方:
+    python scripts/otlp_stub_collector.py --port 4318 --output collected_spans.jsonl
+    # secrets.toml
+    # [tracing]
+    # enabled = true
+    # exporter = "otlp"
+    # otlp_endpoint = "http://localhost:4318/v1/traces"
+"""
+
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# OTLP/JSONの属性リストを辞書に変換する関数
+def _attributes_to_dict(attributes):
+    result = {}
+    for attribute in attributes:
+        value = attribute.get("value", {})
+        result[attribute["key"]] = next(iter(value.values()), None)
+    return result
+
+# 受信したOTLPペイロードからスパンを取り出す関数
+def extract_spans(payload):
+    spans = []
+    for resource_span in payload.get("resourceSpans", []):
+        resource = _attributes_to_dict(resource_span.get("resource", {}).get("attributes", []))
+        for scope_span in resource_span.get("scopeSpans", []):
+            for span in scope_span.get("spans", []):
+                spans.append({
+                    "service": resource.get("service.name"),
+                    "trace_id": span["traceId"],
+                    "span_id": span["spanId"],
+                    "parent_id": span.get("parentSpanId") or None,
+                    "name": span["name"],
+                    "duration": (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e9,
+                    "attributes": _attributes_to_dict(span.get("attributes", [])),
+                })
+    return spans
+
+def main():
+    parser = argparse.ArgumentParser(description="OTLP/HTTP JSON の簡易コレクタ")
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--output", default="collected_spans.jsonl")
+    args = parser.parse_args()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            spans = extract_spans(json.loads(self.rfile.read(length) or b"{}"))
+            with open(args.output, "a", encoding="utf-8") as f:
+                for span in spans:
+                    f.write(json.dumps(span, ensure_ascii=False) + "\n")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, format, *args):
+            pass
+
+    print(f"OTLP stub collector listening on :{args.port} -> {args.output}")
+    ThreadingHTTPServer(("0.0.0.0", args.port), Handler).serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+LLMバックエンドレジストリの動作確認スクリプト
+ローカルのスタブサーバーを複数起動し、ルーティング（p95レイテンシ順）と失敗時の切り替えを確認する。
+設定上後ろにある速いバックエンドにも probe_ratio 分の呼び出しが割り当てられて計測され、
+最終的に先頭になること、常に失敗するバックエンドが最後に回ることを検証する（満たさない場合は終了コード1）。
+
+使い方:
+    python scripts/smoke_llm_backends.py --calls 40
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_openai_server import FakeBackendProfile, start_fake_server
+from llm_backends import DEFAULT_BACKEND_CONFIG, LLMRouter
+from llm_metrics import get_recent_calls, summarize
+from interview_logic import judge_need_followup
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLMバックエンドのルーティング確認")
+    parser.add_argument("--calls", type=int, default=40)
+    parser.add_argument("--probe-ratio", type=float, default=0.25, help="計測値の無いバックエンドを試す割合の上限")
+    args = parser.parse_args()
+
+    # 遅いバックエンド・速いバックエンド・常に失敗するバックエンドを用意
+    servers = {
+        "slow": start_fake_server(profile=FakeBackendProfile(latency=0.3, seed=1)),
+        "fast": start_fake_server(profile=FakeBackendProfile(latency=0.05, seed=2)),
+        "broken": start_fake_server(profile=FakeBackendProfile(latency=0.01, error_rate=1.0, seed=3)),
+    }
+    config = dict(DEFAULT_BACKEND_CONFIG)
+    config["backends"] = {
+        name: {"base_url": base_url, "model": f"fake-{name}", "api_key": "dummy", "max_retries": 0}
+        for name, (_, base_url) in servers.items()
+    }
+    config["routes"] = {"default": ["broken", "slow", "fast"]}
+    config["probe_ratio"] = args.probe_ratio
+    router = LLMRouter("sk-dummy", config)
+
+    for i in range(args.calls):
+        judge_need_followup(router, "面接官：転職理由を教えてください。\nあなた：成長したいからです。")
+        if i in (0, args.calls // 2, args.calls - 1):
+            print(f"call {i + 1:>3}: candidates = {router.candidates('judge')}")
+
+    print()
+    for name in servers:
+        stats = summarize(get_recent_calls("judge", backend=name))
+        p95 = f"{stats['latency_p95']:.3f}s" if stats["latency_p95"] is not None else "-"
+        print(f"{name:<7} calls={stats['count']:>3} p95={p95:>7} error_rate={stats['error_rate']:.0%}")
+
+    candidates = router.candidates("judge")
+    if candidates[0] != "fast" or candidates[-1] != "broken":
+        print(f"NG: 期待する順序は fast が先頭・broken が最後です（実際: {candidates}）")
+        sys.exit(1)
+    print(f"OK: candidates = {candidates}")
+
+if __name__ == "__main__":
+    main()
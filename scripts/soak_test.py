@@ -0,0 +1,566 @@
+"""
+複数プロセスでの負荷試験・長時間試験（ソークテスト）
+`streamlit run rollplay.py` を複数のワーカープロセスで起動し、ローカルのスタブサーバー（OpenAI互換）を
+LLMバックエンドとして、WebSocketレベルの模擬ユーザーにAPIキー入力からフィードバックまでの全ステージを
+繰り返し操作させる。再実行（rerun）のレイテンシ（p50/p95/p99）、エラー率、ワーカーのメモリ使用量の推移、
+セッションあたりのCPU時間を記録し、設定したSLOを満たさない場合は終了コード1で終了する。
+
+模擬ユーザーは一定の割合で「最初からやり直し」（reset_interview_session）や再接続を行うため、
+セッション状態が解放されずにメモリが増え続ける問題も検出できる。
+
+使い方:
+    python scripts/soak_test.py --workers 2 --users 40 --duration 600 --latency 0.8 \
+        --slo-p95 5 --slo-p99 10 --slo-error-rate 0.01 --slo-rss-growth-mb 150 --report soak_report.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import toml
+from tornado.httpclient import HTTPRequest
+from tornado.websocket import websocket_connect
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.Alert_pb2 import Alert
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPTS_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+from llm_metrics import percentile
+
+# 試験用のプロンプト一式（スタブサーバーが応答を選べるよう、判定には Yes/No、フィードバックには合否結果を含める）
+STUB_PROMPTS = {
+    "RULES_TEMPLATE": (
+        "あなたは転職面接の面接官です。候補者は{age}歳、{current_gyokai}業界の{current_job}（{role}、経験{experience_years}）で、"
+        "{target_gyokai}業界の{target_job}を志望しています。"
+    ),
+    "QUESTION_TEMPLATE": "{rules}\n\n# 質問カテゴリ\n{question}\n\n# 評価ポイント\n{evaluation_points}\n\n# 会話履歴\n{history}",
+    "JUDGE_TEMPLATE": "直前の回答に深掘りが必要ならYes、不要ならNoとだけ答えてください。\n\n# 会話履歴\n{history}",
+    "FEEDBACK_TEMPLATE": "# 評価ポイント\n{evaluation_points_list}\n\n# 出力形式\n{evaluation_format}\n\n# 会話履歴\n{history}",
+    "EVALUATION_FORMAT": "合否結果：\n- 評価：\n総評：",
+    "PARTIAL_FEEDBACK_TEMPLATE": "# 評価ポイント\n{evaluation_points_list}\n\n# 出力形式\n{evaluation_format}\n\n# 会話履歴\n{history}",
+    "PARTIAL_EVALUATION_FORMAT": "合否結果：\n- 評価（未回答の項目は評価なし）：\n総評：",
+    "questions_list": [
+        {"title": "転職理由", "point_keys": ["定着性"], "content": "転職を考えた理由を聞いてください。"},
+        {"title": "現職の取り組み", "point_keys": ["課題解決力", "自走力"], "content": "現職で成果を上げた取り組みを聞いてください。"},
+        {"title": "志望動機", "point_keys": ["コミュニケーション力", "定着性"], "content": "志望業界・職種を選んだ理由を聞いてください。"},
+        {"title": "専門スキル", "point_keys": ["専門スキル"], "content": "志望職種で活かせるスキルを聞いてください。"},
+    ],
+    "evaluation_points_list": {
+        "コミュニケーション力": "結論から簡潔に話せているか",
+        "定着性": "転職理由と志望動機に一貫性があるか",
+        "課題解決力": "課題を特定し、解決まで導いた経験があるか",
+        "自走力": "指示を待たずに主体的に動けているか",
+        "専門スキル": "志望職種で再現性のあるスキルを持っているか",
+    },
+}
+
+PROFILE_INPUTS = {
+    "年齢": "29",
+    "現在の業界": "メーカー",
+    "現在の職種": "法人営業",
+    "志望している職種": "カスタマーサクセス",
+    "現在の業務の役割": "メンバー",
+    "現在の業務の経験年数": "5年",
+    "転職を希望している業界": "IT",
+}
+
+INTRO = "メーカーで5年間法人営業を担当し、既存顧客の深耕で前年比120%の売上を達成しました。顧客の課題整理と提案が得意です。"
+
+# 深掘り判定（ローカル判定・LLM判定）の両方を通るよう、短い回答と具体的な回答を混ぜる
+ANSWERS = [
+    "頑張りました。",
+    "顧客ごとの課題を整理し、提案内容を見直すことで継続率を高めました。",
+    "例えば、解約が続いていた30社を担当した際に、利用状況を毎月分析して改善提案を行いました。"
+    "その結果、半年で解約率を15%から5%に下げ、担当エリアの売上も前年比120%になりました。",
+]
+
+# ステージ判定に使う見出し
+STAGE_HEADINGS = {
+    "面接ロールプレイシステムへようこそ": "welcome",
+    "OpenAI APIキー設定": "api_key",
+    "プロフィール入力": "profile",
+    "自己紹介": "intro",
+    "面接質問": "questions",
+    "面接フィードバック": "feedback",
+}
+
+
+# 模擬ユーザー全体の計測結果
+class SoakStats:
+    def __init__(self):
+        self.reruns = []
+        self.errors = {}
+        self.interviews = 0
+        self.resets = 0
+        self.sessions = 0
+
+    def record_rerun(self, action, latency):
+        self.reruns.append({"action": action, "latency": latency, "time": time.time()})
+
+    def record_error(self, kind):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def error_count(self):
+        return sum(self.errors.values())
+
+
+# 操作中に発生したアプリ側のエラー
+class SoakError(Exception):
+    def __init__(self, kind, message=""):
+        super().__init__(f"{kind}: {message}")
+        self.kind = kind
+
+
+# 1人分の模擬ユーザー（1つのWebSocket接続＝1つのStreamlitセッション）
+class SimulatedUser:
+    def __init__(self, user_id, port, stats, args):
+        self.user_id = user_id
+        self.url = f"ws://127.0.0.1:{port}/_stcore/stream"
+        self.stats = stats
+        self.args = args
+        self.random = random.Random(args.seed * 1000 + user_id)
+        self.connection = None
+        self.elements = {}
+
+    async def connect(self):
+        request = HTTPRequest(self.url, connect_timeout=30, request_timeout=30)
+        self.connection = await websocket_connect(
+            request, subprotocols=["streamlit"], max_message_size=64 * 1024 * 1024
+        )
+        self.elements = {}
+        self.stats.sessions += 1
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    # ウィジェットの状態を送って再実行し、スクリプトの実行完了までの時間を返す関数
+    async def rerun(self, action, widgets=()):
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.page_script_hash = ""
+        for widget_id, field, value in widgets:
+            state = msg.rerun_script.widget_states.widgets.add()
+            state.id = widget_id
+            setattr(state, field, value)
+
+        start = time.perf_counter()
+        await self.connection.write_message(msg.SerializeToString(), binary=True)
+        deadline = start + self.args.rerun_timeout
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise SoakError("timeout", action)
+            try:
+                data = await asyncio.wait_for(self.connection.read_message(), remaining)
+            except asyncio.TimeoutError:
+                raise SoakError("timeout", action)
+            if data is None:
+                raise SoakError("disconnected", action)
+
+            forward = ForwardMsg()
+            forward.ParseFromString(data)
+            kind = forward.WhichOneof("type")
+            if kind == "new_session":
+                # 再実行のたびに画面全体が送り直されるため、要素を作り直す
+                self.elements = {}
+            elif kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                self.elements[tuple(forward.metadata.delta_path)] = forward.delta.new_element
+            elif kind == "script_finished":
+                status = forward.script_finished
+                if status == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise SoakError("compile_error", action)
+                if status in (ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY):
+                    break
+
+        latency = time.perf_counter() - start
+        self.stats.record_rerun(action, latency)
+        self._check_errors(action)
+        return latency
+
+    # 画面上の例外表示・エラー表示をエラーとして扱う関数
+    def _check_errors(self, action):
+        for element in self.elements.values():
+            kind = element.WhichOneof("type")
+            if kind == "exception":
+                raise SoakError("exception", f"{action}: {element.exception.message}")
+            if kind == "alert" and element.alert.format == Alert.ERROR:
+                raise SoakError("error_alert", f"{action}: {element.alert.body}")
+
+    # 現在の画面のステージを見出しから判定する関数
+    def stage(self):
+        for element in self.elements.values():
+            if element.WhichOneof("type") == "heading" and element.heading.body in STAGE_HEADINGS:
+                return STAGE_HEADINGS[element.heading.body]
+        return None
+
+    # 種類とラベルからウィジェットのIDを探す関数
+    def widget_id(self, kind, label):
+        for element in self.elements.values():
+            if element.WhichOneof("type") == kind and getattr(element, kind).label == label:
+                return getattr(element, kind).id
+        raise SoakError("widget_not_found", f"{kind}:{label}")
+
+    async def click(self, action, label):
+        return await self.rerun(action, [(self.widget_id("button", label), "trigger_value", True)])
+
+    async def submit_form(self, action, inputs, submit_label):
+        widgets = [(self.widget_id(kind, label), "string_value", value) for kind, label, value in inputs]
+        widgets.append((self.widget_id("button", submit_label), "trigger_value", True))
+        return await self.rerun(action, widgets)
+
+    async def think(self):
+        await asyncio.sleep(self.random.uniform(self.args.think_min, self.args.think_max))
+
+    # 現在のステージに応じて1操作を行う関数（面接が完了したら True を返す）
+    async def step(self):
+        stage = self.stage()
+        if stage == "welcome":
+            await self.click("welcome.start", "面接を開始する")
+        elif stage == "api_key":
+            await self.submit_form(
+                "api_key.submit", [("text_input", "OpenAI APIキーを入力してください", "sk-soak-test")], "APIキーを設定"
+            )
+        elif stage == "profile":
+            await self.submit_form(
+                "profile.submit", [("text_input", label, value) for label, value in PROFILE_INPUTS.items()], "面接開始"
+            )
+        elif stage in ("intro", "questions") and self.random.random() < self.args.reset_rate:
+            # 「最初からやり直し」→「はい」で reset_interview_session を通す
+            await self.click(f"{stage}.restart", "最初からやり直し")
+            await self.think()
+            await self.click(f"{stage}.restart_confirm", "はい")
+            self.stats.resets += 1
+        elif stage == "intro":
+            await self.submit_form("intro.submit", [("text_area", "自己紹介をしてください", INTRO)], "回答を送信")
+        elif stage == "questions":
+            await self.submit_form(
+                "questions.answer", [("text_area", "回答してください", self.random.choice(ANSWERS))], "回答を送信"
+            )
+        elif stage == "feedback":
+            self.stats.interviews += 1
+            return True
+        else:
+            raise SoakError("unknown_stage", str(stage))
+        return False
+
+    # 終了時刻まで面接を繰り返す関数
+    async def run(self, deadline):
+        # 全ユーザーが同時に接続しないよう開始時刻をずらす
+        await asyncio.sleep(self.random.uniform(0, self.args.ramp_up))
+        while time.time() < deadline:
+            try:
+                if self.connection is None:
+                    await self.connect()
+                    await self.rerun("connect")
+                while time.time() < deadline:
+                    await self.think()
+                    if await self.step():
+                        break
+                else:
+                    break
+
+                # 面接完了後は、再接続（新しいセッション）か「新しい面接を開始」（restart_interview）で繰り返す
+                if self.random.random() < self.args.reconnect_rate:
+                    self.close()
+                else:
+                    await self.think()
+                    await self.click("feedback.restart", "新しい面接を開始")
+            except SoakError as e:
+                self.stats.record_error(e.kind)
+                self.close()
+            except Exception as e:
+                self.stats.record_error(type(e).__name__)
+                self.close()
+        self.close()
+
+
+# ワーカープロセスのメモリ使用量（MB）とCPU時間（秒）を返す関数
+def read_process_usage(pid):
+    with open(f"/proc/{pid}/status") as f:
+        rss = next((int(line.split()[1]) / 1024 for line in f if line.startswith("VmRSS:")), 0.0)
+    with open(f"/proc/{pid}/stat") as f:
+        # プロセス名に空白が含まれても崩れないよう、閉じ括弧以降を分割する
+        fields = f.read().rsplit(")", 1)[1].split()
+    cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    return rss, cpu
+
+# ワーカーのメモリ・CPUを定期的に記録するコルーチン
+async def sample_workers(workers, samples, interval, stop):
+    while True:
+        now = time.time()
+        for index, process in enumerate(workers):
+            if process.poll() is None:
+                rss, cpu = read_process_usage(process.pid)
+                samples.append({"time": now, "worker": index, "rss_mb": rss, "cpu_seconds": cpu})
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+            return
+        except asyncio.TimeoutError:
+            pass
+
+# 試験用の作業ディレクトリ（.streamlit/secrets.toml）を作る関数
+def prepare_workdir(base_url):
+    workdir = tempfile.mkdtemp(prefix="mensetsu-soak-")
+    os.makedirs(os.path.join(workdir, ".streamlit"))
+    secrets = {
+        "prompts": STUB_PROMPTS,
+        "llm_backends": {
+            "backends": {"fake": {"base_url": base_url, "model": "fake-model", "api_key": "dummy"}},
+            "routes": {"default": ["fake"], "validate": ["fake"]},
+        },
+        "question_bank": {"enabled": False},
+    }
+    with open(os.path.join(workdir, ".streamlit", "secrets.toml"), "w", encoding="utf-8") as f:
+        toml.dump(secrets, f)
+    return workdir
+
+def _wait_for_url(url, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError(f"{url} が {timeout} 秒以内に起動しませんでした")
+
+# Streamlitのワーカープロセスを起動する関数
+def start_workers(count, base_port, workdir, args):
+    workers = []
+    for index in range(count):
+        port = base_port + index
+        log = open(os.path.join(workdir, f"worker-{index}.log"), "w")
+        workers.append(subprocess.Popen(
+            [
+                sys.executable, "-m", "streamlit", "run", os.path.join(ROOT_DIR, "rollplay.py"),
+                "--server.port", str(port),
+                "--server.address", "127.0.0.1",
+                "--server.headless", "true",
+                "--server.fileWatcherType", "none",
+                "--server.disconnectedSessionTTL", str(args.session_ttl),
+                "--browser.gatherUsageStats", "false",
+            ],
+            cwd=workdir, stdout=log, stderr=subprocess.STDOUT
+        ))
+    for index in range(count):
+        _wait_for_url(f"http://127.0.0.1:{base_port + index}/_stcore/health", 60)
+    return workers
+
+def _stop_process(process):
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+# 計測結果を集計する関数
+def summarize_results(stats, samples, workers, args, elapsed):
+    latencies = [r["latency"] for r in stats.reruns]
+    attempts = len(stats.reruns) + stats.error_count()
+    summary = {
+        "duration": elapsed,
+        "workers": args.workers,
+        "users": args.users,
+        "reruns": len(stats.reruns),
+        "errors": dict(stats.errors),
+        "error_rate": stats.error_count() / attempts if attempts else 0.0,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_p99": percentile(latencies, 99),
+        "interviews": stats.interviews,
+        "resets": stats.resets,
+        "sessions": stats.sessions,
+        "actions": {},
+        "worker_usage": [],
+    }
+    for action in sorted({r["action"] for r in stats.reruns}):
+        action_latencies = [r["latency"] for r in stats.reruns if r["action"] == action]
+        summary["actions"][action] = {
+            "count": len(action_latencies),
+            "p50": percentile(action_latencies, 50),
+            "p95": percentile(action_latencies, 95),
+            "p99": percentile(action_latencies, 99),
+        }
+
+    # ウォームアップ後の最初の記録と最後の記録の差をメモリ増加量とする
+    warmup_end = min(s["time"] for s in samples) + args.warmup if samples else 0
+    total_cpu = 0.0
+    for index in range(len(workers)):
+        worker_samples = [s for s in samples if s["worker"] == index]
+        if not worker_samples:
+            continue
+        steady = [s for s in worker_samples if s["time"] >= warmup_end] or worker_samples[-1:]
+        cpu = worker_samples[-1]["cpu_seconds"] - worker_samples[0]["cpu_seconds"]
+        total_cpu += cpu
+        minutes = (steady[-1]["time"] - steady[0]["time"]) / 60
+        summary["worker_usage"].append({
+            "worker": index,
+            "rss_start_mb": worker_samples[0]["rss_mb"],
+            "rss_after_warmup_mb": steady[0]["rss_mb"],
+            "rss_end_mb": worker_samples[-1]["rss_mb"],
+            "rss_peak_mb": max(s["rss_mb"] for s in worker_samples),
+            "rss_growth_mb": steady[-1]["rss_mb"] - steady[0]["rss_mb"],
+            "rss_growth_mb_per_minute": (steady[-1]["rss_mb"] - steady[0]["rss_mb"]) / minutes if minutes else 0.0,
+            "cpu_seconds": cpu,
+        })
+    summary["cpu_seconds"] = total_cpu
+    summary["cpu_seconds_per_interview"] = total_cpu / stats.interviews if stats.interviews else None
+    summary["cpu_seconds_per_session"] = total_cpu / stats.sessions if stats.sessions else None
+    # 同時接続ユーザー1人あたりの平均CPU使用率
+    summary["cpu_percent_per_user"] = total_cpu / elapsed / args.users * 100 if elapsed and args.users else 0.0
+    return summary
+
+# SLOの判定結果（違反内容のリスト）を返す関数
+def check_slo(summary, args):
+    violations = []
+    if args.slo_p95 and summary["latency_p95"] is not None and summary["latency_p95"] > args.slo_p95:
+        violations.append(f"rerun p95 {summary['latency_p95']:.2f}s > {args.slo_p95}s")
+    if args.slo_p99 and summary["latency_p99"] is not None and summary["latency_p99"] > args.slo_p99:
+        violations.append(f"rerun p99 {summary['latency_p99']:.2f}s > {args.slo_p99}s")
+    if args.slo_error_rate is not None and summary["error_rate"] > args.slo_error_rate:
+        violations.append(f"error rate {summary['error_rate']:.2%} > {args.slo_error_rate:.2%}")
+    if args.slo_rss_growth_mb:
+        for usage in summary["worker_usage"]:
+            if usage["rss_growth_mb"] > args.slo_rss_growth_mb:
+                violations.append(
+                    f"worker {usage['worker']} RSS growth {usage['rss_growth_mb']:.1f}MB > {args.slo_rss_growth_mb}MB"
+                )
+    if args.slo_cpu_per_interview and summary["cpu_seconds_per_interview"] is not None \
+            and summary["cpu_seconds_per_interview"] > args.slo_cpu_per_interview:
+        violations.append(
+            f"CPU per interview {summary['cpu_seconds_per_interview']:.2f}s > {args.slo_cpu_per_interview}s"
+        )
+    if summary["reruns"] == 0:
+        violations.append("no rerun completed")
+    return violations
+
+def print_summary(summary):
+    def fmt(value):
+        return f"{value:.3f}s" if value is not None else "-"
+
+    print(f"\n期間 {summary['duration']:.0f}s / ワーカー {summary['workers']} / 模擬ユーザー {summary['users']}")
+    print(
+        f"再実行 {summary['reruns']} 回  p50={fmt(summary['latency_p50'])} p95={fmt(summary['latency_p95'])} "
+        f"p99={fmt(summary['latency_p99'])}  エラー率={summary['error_rate']:.2%} {summary['errors']}"
+    )
+    print(f"完了した面接 {summary['interviews']} / やり直し {summary['resets']} / セッション {summary['sessions']}")
+    for action, values in summary["actions"].items():
+        print(f"  {action:<28} n={values['count']:<6} p50={fmt(values['p50'])} p95={fmt(values['p95'])} p99={fmt(values['p99'])}")
+    for usage in summary["worker_usage"]:
+        print(
+            f"  worker {usage['worker']}: RSS {usage['rss_start_mb']:.0f}MB → {usage['rss_end_mb']:.0f}MB "
+            f"(ウォームアップ後 {usage['rss_growth_mb']:+.1f}MB, {usage['rss_growth_mb_per_minute']:+.2f}MB/分) "
+            f"CPU {usage['cpu_seconds']:.1f}s"
+        )
+    per_interview = summary["cpu_seconds_per_interview"]
+    print(
+        f"CPU 合計 {summary['cpu_seconds']:.1f}s / 面接あたり {fmt(per_interview)} / "
+        f"ユーザーあたり {summary['cpu_percent_per_user']:.2f}%"
+    )
+
+async def run_soak(args):
+    fake_server = subprocess.Popen(
+        [sys.executable, os.path.join(SCRIPTS_DIR, "fake_openai_server.py"),
+         "--port", str(args.fake_port), "--latency", str(args.latency),
+         "--error-rate", str(args.fake_error_rate), "--seed", str(args.seed)],
+        stdout=subprocess.DEVNULL
+    )
+    workdir = prepare_workdir(f"http://127.0.0.1:{args.fake_port}/v1")
+    workers = []
+    try:
+        workers = start_workers(args.workers, args.base_port, workdir, args)
+        print(f"ワーカー {args.workers} 個を起動しました（ポート {args.base_port}〜、ログ: {workdir}）")
+
+        stats = SoakStats()
+        samples = []
+        stop_sampling = asyncio.Event()
+        sampler = asyncio.ensure_future(sample_workers(workers, samples, args.sample_interval, stop_sampling))
+
+        start = time.time()
+        deadline = start + args.duration
+        users = [
+            SimulatedUser(i, args.base_port + i % args.workers, stats, args)
+            for i in range(args.users)
+        ]
+        await asyncio.gather(*[user.run(deadline) for user in users])
+
+        # 切断されたセッションが破棄されるのを待ってから最後のメモリを記録する
+        await asyncio.sleep(args.cooldown)
+        stop_sampling.set()
+        await sampler
+        elapsed = time.time() - start
+
+        summary = summarize_results(stats, samples, workers, args, elapsed)
+        summary["rss_timeline"] = samples
+        return summary, workdir
+    finally:
+        for process in workers:
+            _stop_process(process)
+        _stop_process(fake_server)
+
+def main():
+    parser = argparse.ArgumentParser(description="複数プロセスでの負荷試験・長時間試験（ソークテスト）")
+    parser.add_argument("--workers", type=int, default=2, help="Streamlitのワーカープロセス数")
+    parser.add_argument("--users", type=int, default=20, help="同時に操作する模擬ユーザー数")
+    parser.add_argument("--duration", type=float, default=300, help="試験時間（秒）")
+    parser.add_argument("--base-port", type=int, default=8601, help="ワーカーの最初のポート")
+    parser.add_argument("--fake-port", type=int, default=8599, help="スタブサーバーのポート")
+    parser.add_argument("--latency", type=float, default=0.8, help="スタブサーバーの応答時間の中央値（秒）")
+    parser.add_argument("--fake-error-rate", type=float, default=0.0, help="スタブサーバーがエラーを返す確率")
+    parser.add_argument("--think-min", type=float, default=1.0, help="操作間の待ち時間の最小値（秒）")
+    parser.add_argument("--think-max", type=float, default=4.0, help="操作間の待ち時間の最大値（秒）")
+    parser.add_argument("--ramp-up", type=float, default=10.0, help="全ユーザーが接続し終えるまでの時間（秒）")
+    parser.add_argument("--reset-rate", type=float, default=0.02, help="各操作で「最初からやり直し」を選ぶ確率")
+    parser.add_argument("--reconnect-rate", type=float, default=0.5, help="面接完了後に新しいセッションで接続し直す確率")
+    parser.add_argument("--rerun-timeout", type=float, default=60.0, help="1回の再実行を失敗とみなすまでの秒数")
+    parser.add_argument("--session-ttl", type=int, default=10, help="切断されたセッションを保持する秒数")
+    parser.add_argument("--sample-interval", type=float, default=5.0, help="メモリ・CPUの記録間隔（秒）")
+    parser.add_argument("--warmup", type=float, default=30.0, help="メモリ増加量の計算から除外する開始直後の秒数")
+    parser.add_argument("--cooldown", type=float, default=15.0, help="試験終了後、最後の記録までに待つ秒数")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--slo-p95", type=float, default=5.0, help="再実行レイテンシp95の上限（秒、0で無効）")
+    parser.add_argument("--slo-p99", type=float, default=10.0, help="再実行レイテンシp99の上限（秒、0で無効）")
+    parser.add_argument("--slo-error-rate", type=float, default=0.01, help="エラー率の上限")
+    parser.add_argument("--slo-rss-growth-mb", type=float, default=200.0, help="ワーカーごとのメモリ増加量の上限（MB、0で無効）")
+    parser.add_argument("--slo-cpu-per-interview", type=float, default=0.0, help="面接1回あたりのCPU時間の上限（秒、0で無効）")
+    parser.add_argument("--report", help="計測結果をJSONで保存するパス")
+    parser.add_argument("--keep-workdir", action="store_true", help="ワーカーのログを含む作業ディレクトリを残す")
+    args = parser.parse_args()
+
+    summary, workdir = asyncio.run(run_soak(args))
+    print_summary(summary)
+
+    violations = check_slo(summary, args)
+    summary["slo_violations"] = violations
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    if args.keep_workdir or violations:
+        print(f"ワーカーのログ: {workdir}")
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if violations:
+        print("\nSLO違反:")
+        for violation in violations:
+            print(f"  - {violation}")
+        sys.exit(1)
+    print("\nSLOを満たしました")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+LLM呼び出しメトリクスの集計スクリプト
+secrets.toml の [llm_metrics] log_path に記録したJSONLを、呼び出し種別と出力モードごとに集計する
+（例: question_output.mode を "legacy" と "json" で切り替えて記録し、出力トークン数とレイテンシを比較）
+
+使い方:
+    python scripts/summarize_llm_metrics.py llm_calls.jsonl
+    python scripts/summarize_llm_metrics.py llm_calls.jsonl --group-by call_type mode
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_metrics import summarize
+
+
+# 集計値を表示用の文字列に整形する関数
+def _fmt(value, pattern):
+    return pattern.format(value) if value is not None else "-"
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM呼び出しメトリクスの集計")
+    parser.add_argument("log_path", help="llm_metrics の log_path に記録したJSONLファイル")
+    parser.add_argument("--group-by", nargs="+", default=["call_type", "mode"], help="集計キー")
+    args = parser.parse_args()
+
+    groups = defaultdict(list)
+    with open(args.log_path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                groups[tuple(str(record.get(k, "-")) for k in args.group_by)].append(record)
+
+    header = " / ".join(args.group_by)
+    print(f"{header:<30} {'count':>6} {'p50(s)':>8} {'p95(s)':>8} {'prompt':>8} {'completion':>10} {'error':>6}")
+    for key in sorted(groups):
+        stats = summarize(groups[key])
+        print(
+            f"{' / '.join(key):<30} {stats['count']:>6} "
+            f"{_fmt(stats['latency_p50'], '{:.2f}'):>8} {_fmt(stats['latency_p95'], '{:.2f}'):>8} "
+            f"{_fmt(stats['avg_prompt_tokens'], '{:.0f}'):>8} {_fmt(stats['avg_completion_tokens'], '{:.0f}'):>10} "
+            f"{stats['error_rate']:>6.1%}"
+        )
+
+if __name__ == "__main__":
+    main()
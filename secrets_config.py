@@ -3,13 +3,33 @@ Streamlit Secrets設定用のプロンプト管理
 本番環境ではStreamlit Cloudのsecretsから読み込み、開発環境ではprompts.pyから読み込む
 """
 
+import threading
+
 import streamlit as st
+from tracing import traced
+
+# 読み込み済みのプロンプトデータ（secrets.toml の変更時に破棄する）
+_prompts = None
+_prompts_lock = threading.Lock()
+_prompts_generation = 0
+_listening = False
+
+
+# secrets.toml が変更されたときに、読み込み済みのプロンプトデータを破棄する関数
+def _clear_prompts(sender=None):
+    global _prompts, _prompts_generation
+    with _prompts_lock:
+        _prompts = None
+        _prompts_generation += 1
 
 # プロンプトデータをStreamlit Secretsまたはローカルファイルから取得する関数
+@traced()
 def get_prompts_from_secrets():
     """
     Streamlit Cloud環境では st.secrets から、ローカル環境では prompts.py から
     プロンプトデータを読み込む。フォールバック機能により両環境で動作可能。
+    読み込んだデータはプロセス内で同じオブジェクトを使い回し（呼び出し側で変更しないこと）、
+    secrets.toml が変更された場合は次回の呼び出しで読み込み直す。
     
     Returns:
         dict: プロンプトテンプレート、質問リスト、評価ポイントを含む辞書
@@ -17,9 +37,28 @@ def get_prompts_from_secrets():
               - QUESTION_TEMPLATE: 質問生成用プロンプト
               - JUDGE_TEMPLATE: 深掘り判定用プロンプト
               - FEEDBACK_TEMPLATE: フィードバック生成用プロンプト
+              - PERSONALIZE_TEMPLATE: 質問バンクの質問を自己紹介に合わせて調整するプロンプト（任意、未設定なら None）
               - questions_list: 質問カテゴリのリスト
               - evaluation_points_list: 評価軸の辞書
     """
+    global _prompts, _listening
+    with _prompts_lock:
+        if _prompts is not None:
+            return _prompts
+        if not _listening:
+            st.secrets.file_change_listener.connect(_clear_prompts, weak=False)
+            _listening = True
+        generation = _prompts_generation
+
+    prompts = _load_prompts()
+    with _prompts_lock:
+        # 読み込み中に secrets.toml が変更された場合は保持せず、次回読み込み直す
+        if generation == _prompts_generation:
+            _prompts = prompts
+    return prompts
+
+# プロンプトデータを読み込む関数（get_prompts_from_secrets の本体）
+def _load_prompts():
     try:
         # Streamlit Cloud環境での設定
         rules_template = st.secrets["prompts"]["RULES_TEMPLATE"]
@@ -29,6 +68,7 @@ def get_prompts_from_secrets():
         evaluation_format = st.secrets["prompts"]["EVALUATION_FORMAT"]
         partial_feedback_template = st.secrets["prompts"]["PARTIAL_FEEDBACK_TEMPLATE"]
         partial_evaluation_format = st.secrets["prompts"]["PARTIAL_EVALUATION_FORMAT"]
+        personalize_template = st.secrets["prompts"].get("PERSONALIZE_TEMPLATE")
         
         # 質問リストを新しいTOML配列形式で取得
         questions_list = []
@@ -53,6 +93,7 @@ def get_prompts_from_secrets():
             "EVALUATION_FORMAT": evaluation_format,
             "PARTIAL_FEEDBACK_TEMPLATE": partial_feedback_template,
             "PARTIAL_EVALUATION_FORMAT": partial_evaluation_format,
+            "PERSONALIZE_TEMPLATE": personalize_template,
             "questions_list": questions_list,
             "evaluation_points_list": evaluation_points_list
         }
@@ -66,6 +107,7 @@ def get_prompts_from_secrets():
                 PARTIAL_FEEDBACK_TEMPLATE, PARTIAL_EVALUATION_FORMAT,
                 questions_list, evaluation_points_list
             )
+            import prompts as local_prompts
             return {
                 "RULES_TEMPLATE": RULES_TEMPLATE,
                 "QUESTION_TEMPLATE": QUESTION_TEMPLATE,
@@ -74,9 +116,32 @@ def get_prompts_from_secrets():
                 "EVALUATION_FORMAT": EVALUATION_FORMAT,
                 "PARTIAL_FEEDBACK_TEMPLATE": PARTIAL_FEEDBACK_TEMPLATE,
                 "PARTIAL_EVALUATION_FORMAT": PARTIAL_EVALUATION_FORMAT,
+                "PERSONALIZE_TEMPLATE": getattr(local_prompts, "PERSONALIZE_TEMPLATE", None),
                 "questions_list": questions_list,
                 "evaluation_points_list": evaluation_points_list
             }
         except ImportError:
             st.error("プロンプト設定が見つかりません。Streamlit Cloudのsecretsを設定するか、ローカル環境でprompts.pyファイルを配置してください。")
             st.stop()
+
+# 任意の設定セクションをStreamlit Secretsから取得し、既定値とマージする関数
+def get_config_section(section, defaults):
+    """
+    Streamlit Secrets の [section] テーブルを読み込み、未設定の項目は defaults で補う。
+    secretsが存在しない環境（ローカル・スクリプト実行）では defaults をそのまま返す。
+    
+    Args:
+        section (str): secrets.toml 上のセクション名
+        defaults (dict): 既定値の辞書
+        
+    Returns:
+        dict: 既定値に secrets の値を上書きした設定辞書
+    """
+    config = dict(defaults)
+    try:
+        if section in st.secrets:
+            config.update(dict(st.secrets[section]))
+    except Exception:
+        # secrets.toml が無い場合は既定値で動作させる
+        pass
+    return config
@@ -0,0 +1,383 @@
+"""
+リクエストトレーシングとプロファイリングのための軽量モジュール
+Streamlitの再実行（rerun）・各ステージ関数・LLM呼び出しをスパンとして計測し、
+ローカルファイルまたはOTLP互換コレクタへ出力する。Prometheus形式のメトリクスも公開する。
+無効時（既定）はフラグ判定のみで元の関数を呼び出すため、オーバーヘッドは無視できる。
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# トレーシングの既定設定（secrets.toml の [tracing] で上書き可能）
+DEFAULT_TRACING_CONFIG = {
+    "enabled": False,
+    # "file"（JSONL追記）、"otlp"（OTLP/HTTP JSON送信）、"none"（メトリクスのみ）
+    "exporter": "file",
+    "file_path": "traces.jsonl",
+    "otlp_endpoint": "http://localhost:4318/v1/traces",
+    "service_name": "mensetsu-rollplay",
+    # 出力するトレースの割合（ルートスパン単位で判定）
+    "sample_rate": 1.0,
+    # Prometheus形式メトリクスを公開するポート（0なら公開しない）
+    "metrics_port": 0,
+    # この秒数を超えた再実行にサンプリングプロファイラを付与する（0なら無効）
+    "profile_slow_rerun_seconds": 0,
+    "profile_interval_seconds": 0.005,
+    "profile_dir": "profiles",
+}
+
+# レイテンシヒストグラムのバケット境界（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_enabled = None
+_config = None
+_exporter = None
+_current_span = contextvars.ContextVar("current_span", default=None)
+_init_lock = threading.Lock()
+
+
+# 何もしないスパン（トレーシング無効時に使用）
+class _NoopSpan:
+    sampled = False
+
+    def set_attribute(self, key, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NOOP_SPAN = _NoopSpan()
+
+
+# 計測中のスパン
+class Span:
+    def __init__(self, name, parent, sampled, attributes):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else "%032x" % random.getrandbits(128)
+        self.span_id = "%016x" % random.getrandbits(64)
+        self.parent_id = parent.span_id if parent else None
+        self.sampled = sampled
+        self.attributes = dict(attributes)
+        self.start_time = None
+        self.end_time = None
+        self.status = "ok"
+        self._token = None
+        self._profiler = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self._token = _current_span.set(self)
+        threshold = _config["profile_slow_rerun_seconds"]
+        if self.name == "rerun" and threshold:
+            self._profiler = _SlowRerunProfiler(threading.get_ident(), threshold, _config["profile_interval_seconds"])
+            self._profiler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._start
+        self.end_time = self.start_time + duration
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attributes["exception"] = exc_type.__name__
+            # st.rerun() などStreamlitの制御用例外はエラー扱いしない
+            if not exc_type.__module__.startswith("streamlit"):
+                self.status = "error"
+        if self._profiler is not None:
+            profile_path = self._profiler.stop(self)
+            if profile_path:
+                self.attributes["profile_path"] = profile_path
+
+        _metrics.observe(self.name, duration)
+        if self.sampled and _exporter is not None:
+            _exporter.submit(self)
+        return False
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration": self.end_time - self.start_time,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+# Prometheus形式のレイテンシヒストグラムとカウンタ
+class _Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = defaultdict(lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+        self._sums = defaultdict(float)
+        self._counters = defaultdict(float)
+
+    def observe(self, span_name, duration):
+        with self._lock:
+            counts = self._buckets[span_name]
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if duration <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            self._sums[span_name] += duration
+
+    def increment(self, name, labels, value=1):
+        with self._lock:
+            self._counters[(name, tuple(sorted(labels.items())))] += value
+
+    def render(self):
+        lines = [
+            "# HELP mensetsu_span_duration_seconds Span latency",
+            "# TYPE mensetsu_span_duration_seconds histogram",
+        ]
+        with self._lock:
+            for span_name in sorted(self._buckets):
+                counts = self._buckets[span_name]
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), counts):
+                    cumulative += count
+                    lines.append(f'mensetsu_span_duration_seconds_bucket{{span="{span_name}",le="{bound}"}} {cumulative}')
+                lines.append(f'mensetsu_span_duration_seconds_sum{{span="{span_name}"}} {self._sums[span_name]}')
+                lines.append(f'mensetsu_span_duration_seconds_count{{span="{span_name}"}} {cumulative}')
+            for name in sorted({n for n, _ in self._counters}):
+                lines.append(f"# TYPE {name} counter")
+            for (name, labels), value in sorted(self._counters.items()):
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+                lines.append(f"{name}{{{label_text}}} {value}")
+        return "\n".join(lines) + "\n"
+
+_metrics = _Metrics()
+
+
+# スパンをバックグラウンドスレッドでまとめて出力するエクスポータ
+class _SpanExporter:
+    def __init__(self, config):
+        self._config = config
+        self._queue = queue.Queue(maxsize=10000)
+        thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        thread.start()
+
+    def submit(self, span):
+        try:
+            self._queue.put_nowait(span.to_dict())
+        except queue.Full:
+            pass
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + 1.0
+            while len(batch) < 100 and time.monotonic() < deadline:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                if self._config["exporter"] == "otlp":
+                    self._export_otlp(batch)
+                else:
+                    self._export_file(batch)
+            except Exception as e:
+                logger.warning("スパンの出力に失敗しました: %s", e)
+
+    def _export_file(self, batch):
+        with open(self._config["file_path"], "a", encoding="utf-8") as f:
+            for span in batch:
+                f.write(json.dumps(span, ensure_ascii=False) + "\n")
+
+    def _export_otlp(self, batch):
+        import httpx
+        spans = [
+            {
+                "traceId": span["trace_id"],
+                "spanId": span["span_id"],
+                "parentSpanId": span["parent_id"] or "",
+                "name": span["name"],
+                "kind": 1,
+                "startTimeUnixNano": int(span["start_time"] * 1e9),
+                "endTimeUnixNano": int(span["end_time"] * 1e9),
+                "attributes": [_otlp_attribute(k, v) for k, v in span["attributes"].items()],
+                "status": {"code": 2 if span["status"] == "error" else 1},
+            }
+            for span in batch
+        ]
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", self._config["service_name"])]},
+                "scopeSpans": [{"scope": {"name": "mensetsu_rollplay.tracing"}, "spans": spans}],
+            }]
+        }
+        httpx.post(self._config["otlp_endpoint"], json=payload, timeout=5.0)
+
+# OTLP/JSON形式の属性値に変換する関数
+def _otlp_attribute(key, value):
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+# 遅い再実行にだけ付与するサンプリングプロファイラ
+# 閾値を超えるまでは待機するだけなので、速い再実行には影響しない
+class _SlowRerunProfiler:
+    def __init__(self, thread_id, threshold, interval):
+        self._thread_id = thread_id
+        self._threshold = threshold
+        self._interval = interval
+        self._done = threading.Event()
+        self._stacks = defaultdict(int)
+        self._thread = threading.Thread(target=self._run, name="rerun-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        if self._done.wait(self._threshold):
+            return
+        while not self._done.is_set():
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if stack:
+                self._stacks[";".join(reversed(stack))] += 1
+            self._done.wait(self._interval)
+
+    def stop(self, span):
+        self._done.set()
+        self._thread.join()
+        if not self._stacks:
+            return None
+        # flamegraph.pl / speedscope で読めるcollapsed形式で保存
+        os.makedirs(_config["profile_dir"], exist_ok=True)
+        path = os.path.join(_config["profile_dir"], f"rerun-{span.trace_id}.collapsed")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(self._stacks.items()):
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+# Prometheusのスクレイプ要求に応答するハンドラ
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = _metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+# メトリクス公開用HTTPサーバーを起動する関数
+def _start_metrics_server(port):
+    try:
+        server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    except OSError as e:
+        logger.warning("メトリクスサーバーを起動できませんでした（port=%s）: %s", port, e)
+        return
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+
+
+# トレーシング設定を読み込み、有効ならエクスポータ等を初期化する関数
+def _initialize():
+    global _enabled, _config, _exporter
+    with _init_lock:
+        if _enabled is not None:
+            return _enabled
+        from secrets_config import get_config_section
+        _config = get_config_section("tracing", DEFAULT_TRACING_CONFIG)
+        if _config["enabled"]:
+            if _config["exporter"] in ("file", "otlp"):
+                _exporter = _SpanExporter(_config)
+            if _config["metrics_port"]:
+                _start_metrics_server(int(_config["metrics_port"]))
+        _enabled = bool(_config["enabled"])
+        return _enabled
+
+# トレーシングが有効かどうかを返す関数
+def is_enabled():
+    if _enabled is None:
+        return _initialize()
+    return _enabled
+
+# スパンを開始する関数（with文で使用）
+def span(name, **attributes):
+    """
+    Args:
+        name (str): スパン名（例: "rerun", "show_question_stage", "llm.question"）
+        **attributes: ステージ・カテゴリ・深掘り回数などの属性
+
+    Returns:
+        コンテキストマネージャ（無効時は何もしないスパン）
+    """
+    if not is_enabled():
+        return _NOOP_SPAN
+    parent = _current_span.get()
+    if parent is None:
+        sampled = random.random() < _config["sample_rate"]
+    else:
+        sampled = parent.sampled
+    return Span(name, parent, sampled, attributes)
+
+# 関数呼び出し全体をスパンとして計測するデコレータ
+def traced(name=None):
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not is_enabled():
+                return func(*args, **kwargs)
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# 実行中のスパンに属性を追加する関数
+def set_span_attributes(**attributes):
+    if not is_enabled():
+        return
+    current = _current_span.get()
+    if current is not None:
+        for key, value in attributes.items():
+            current.set_attribute(key, value)
+
+# トークン数などのカウンタを加算する関数
+def increment_counter(name, value=1, **labels):
+    if not is_enabled():
+        return
+    _metrics.increment(name, labels, value)